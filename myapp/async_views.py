@@ -0,0 +1,146 @@
+"""
+Async read-only variants of the vendor and purchase order endpoints, served under `/api/async/`.
+
+The views use Django's async ORM and the `.values()` converters of the fast read path, so
+rows are returned exactly as the sync endpoints serialize them, and an ASGI worker does not
+hold a thread per request while it waits on the database.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+from .cache import get_vendor_metrics, add_vendor_metrics
+from .fastpath import compile_converters, convert_rows
+from .pagination import KeysetPagination
+from .models import Vendor, PurchaseOrder, PERFORMANCE_METRICS
+from .serializers import VendorSerializer, PurchaseOrderSerializer
+
+
+def json_response(data, status=status.HTTP_200_OK):
+    """
+    Return `data` rendered exactly like the DRF JSON responses.
+    """
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+
+def _authenticate(request):
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        result = authentication_class().authenticate(request)
+        if result is not None:
+            return result[0]
+    return None
+
+
+async def authenticate(request):
+    """
+    Check the method and authenticate the request with the configured DRF authentication classes.
+
+    Returns:
+    - HttpResponse: A 405 or 401 response if the request is rejected, None otherwise.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return json_response({'detail': f'Method "{request.method}" not allowed.'},
+                             status=status.HTTP_405_METHOD_NOT_ALLOWED)
+    try:
+        user = await sync_to_async(_authenticate)(request)
+    except exceptions.APIException as exc:
+        return json_response({'detail': exc.detail}, status=status.HTTP_401_UNAUTHORIZED)
+    if user is None:
+        return json_response({'detail': exceptions.NotAuthenticated.default_detail},
+                             status=status.HTTP_401_UNAUTHORIZED)
+    request.user = user
+    return None
+
+
+def _converters(serializer_class, model):
+    converters = compile_converters(serializer_class(), model)
+    columns = {column for _, column, _ in converters}
+    return converters, columns
+
+
+async def _retrieve(request, queryset, serializer_class, pk):
+    unauthorized = await authenticate(request)
+    if unauthorized:
+        return unauthorized
+    converters, columns = _converters(serializer_class, queryset.model)
+    row = await queryset.filter(pk=pk).values(*columns).afirst()
+    if row is None:
+        return json_response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+    return json_response(convert_rows([row], converters)[0])
+
+
+async def _list(request, queryset, serializer_class):
+    unauthorized = await authenticate(request)
+    if unauthorized:
+        return unauthorized
+    try:
+        after = int(request.GET.get('after', 0))
+        page_size = min(int(request.GET.get('page_size', api_settings.PAGE_SIZE)), KeysetPagination.max_page_size)
+    except ValueError:
+        return json_response({'error': 'after and page_size must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+    if page_size < 1:
+        return json_response({'error': 'page_size must be positive'}, status=status.HTTP_400_BAD_REQUEST)
+
+    converters, columns = _converters(serializer_class, queryset.model)
+    rows = [row async for row in
+            queryset.filter(pk__gt=after).order_by('pk').values('pk', *columns)[:page_size + 1]]
+    next_url = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        query = request.GET.copy()
+        query['after'] = rows[-1]['pk']
+        next_url = request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+    return json_response({'next': next_url, 'results': convert_rows(rows, converters)})
+
+
+async def vendor_list(request):
+    """
+    List vendors, paginated on `id` with `?after=<last id>` and `?page_size=`.
+    """
+    return await _list(request, Vendor.objects.all(), VendorSerializer)
+
+
+async def vendor_detail(request, pk):
+    """
+    Retrieve a vendor.
+    """
+    return await _retrieve(request, Vendor.objects.all(), VendorSerializer, pk)
+
+
+async def vendor_performance(request, vendor_id):
+    """
+    Retrieve the performance metrics of a vendor, from the cache when possible.
+    """
+    unauthorized = await authenticate(request)
+    if unauthorized:
+        return unauthorized
+    performance_metrics = await sync_to_async(get_vendor_metrics)(vendor_id)
+    if performance_metrics is None:
+        performance_metrics = await Vendor.objects.filter(pk=vendor_id).values(*PERFORMANCE_METRICS).afirst()
+        if performance_metrics is None:
+            return json_response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+        await sync_to_async(add_vendor_metrics)(vendor_id, performance_metrics)
+    return json_response(performance_metrics)
+
+
+async def purchase_order_list(request):
+    """
+    List purchase orders, optionally of one vendor (`?vendor_id=`), paginated on `id` with
+    `?after=<last id>` and `?page_size=`.
+    """
+    queryset = PurchaseOrder.objects.all()
+    vendor_id = request.GET.get('vendor_id')
+    if vendor_id and not vendor_id.isdigit():
+        return json_response({'error': 'vendor_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    if vendor_id:
+        queryset = queryset.filter(vendor_id=vendor_id)
+    return await _list(request, queryset, PurchaseOrderSerializer)
+
+
+async def purchase_order_detail(request, pk):
+    """
+    Retrieve a purchase order.
+    """
+    return await _retrieve(request, PurchaseOrder.objects.all(), PurchaseOrderSerializer, pk)
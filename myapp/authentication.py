@@ -0,0 +1,46 @@
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .cache import get_cached_user, cache_user
+
+# the user columns kept in the cache; the password hash is not cached
+CACHED_USER_FIELDS = ('id', 'username', 'is_active', 'is_staff', 'is_superuser')
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication resolving the user from the cache instead of querying it on every request.
+
+    Users are cached for `VMS_AUTH_USER_CACHE_TIMEOUT` seconds after a lookup, under a key
+    whose version is bumped whenever they are saved or deleted, so deactivating a user or
+    changing their password takes effect on the next request. Only CACHED_USER_FIELDS and a
+    digest of the password hash are cached. The inactive user and changed password checks of
+    JWTAuthentication are applied to cached users as well.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+        key, cached = get_cached_user(user_id)
+        if cached is None:
+            user = super().get_user(validated_token)
+            cache_user(key, ({field: getattr(user, field) for field in CACHED_USER_FIELDS},
+                             get_md5_hash_password(user.password)))
+            return user
+
+        values, password_digest = cached
+        # the other columns are deferred: loaded on access, and left out by save()
+        field_names = [field.attname for field in self.user_model._meta.concrete_fields
+                       if field.attname in values]
+        user = self.user_model.from_db(DEFAULT_DB_ALIAS, field_names, [values[name] for name in field_names])
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM) != password_digest:
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
@@ -0,0 +1,106 @@
+"""
+Helpers for seeding synthetic datasets and timing queries in the benchmark commands.
+"""
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import Vendor, PurchaseOrder, PurchaseOrderItem, HistoricalPerformance
+
+
+def seed_dataset(vendors=20, purchase_orders=1000, history=100, prefix='bench', batch_size=5000, seed=0):
+    """
+    Insert `vendors` vendors with `purchase_orders` orders and `history` hourly performance buckets each.
+
+    Rows are created with `bulk_create`, so no signals fire; the purchase order line items
+    and the vendor counters and metrics are rebuilt for all seeded vendors at the end.
+
+    Returns:
+        list: The created vendors.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    created_vendors = Vendor.objects.bulk_create([
+        # no email, so benchmarks never send notifications
+        Vendor(name=f'{prefix} vendor {i}', contact_details='...', address='...', vendor_code=f'{prefix}-{i}')
+        for i in range(vendors)
+    ])
+    # bulk_create only returns primary keys on some backends
+    created_vendors = list(Vendor.objects.filter(vendor_code__startswith=f'{prefix}-').order_by('id'))
+
+    batch = []
+    for vendor in created_vendors:
+        for i in range(purchase_orders):
+            issue_date = now - timedelta(days=rng.uniform(0, 365))
+            status = rng.choices(('completed', 'pending', 'canceled'), weights=(6, 3, 1))[0]
+            delivery_date = issue_date + timedelta(days=rng.uniform(1, 30))
+            if status == 'pending':
+                delivery_date = now + timedelta(days=rng.uniform(-5, 30))
+            completed = status == 'completed'
+            purchase_order = PurchaseOrder(
+                po_number=f'{prefix}-{vendor.pk}-{i}',
+                vendor=vendor,
+                order_date=issue_date,
+                issue_date=issue_date,
+                delivery_date=delivery_date,
+                delivered_date=(delivery_date + timedelta(days=rng.uniform(-3, 2))).date() if completed else None,
+                items=[{'item_name': f'Item {rng.randint(1, 500)}', 'quantity': rng.randint(1, 50)}],
+                quantity=rng.randint(1, 50),
+                status=status,
+                quality_rating=round(rng.uniform(0, 5), 1) if completed and rng.random() < 0.8 else None,
+                acknowledgment_date=issue_date + timedelta(hours=rng.uniform(1, 72)) if rng.random() < 0.7 else None,
+            )
+            purchase_order.set_derived_fields()
+            batch.append(purchase_order)
+            if len(batch) >= batch_size:
+                PurchaseOrder.objects.bulk_create(batch)
+                batch = []
+    PurchaseOrder.objects.bulk_create(batch)
+    PurchaseOrderItem.rebuild(PurchaseOrder.objects.filter(vendor__in=created_vendors), batch_size=batch_size)
+
+    current_hour = timezone.localtime(now).replace(minute=0, second=0, microsecond=0)
+    HistoricalPerformance.objects.bulk_create([
+        HistoricalPerformance(
+            vendor=vendor,
+            date=current_hour - timedelta(hours=hour),
+            granularity='hour',
+            on_time_delivery_rate=rng.uniform(0, 100),
+            quality_rating_avg=rng.uniform(0, 5),
+            average_response_time=rng.uniform(0, 72),
+            fulfillment_rate=rng.uniform(0, 100),
+        )
+        for vendor in created_vendors for hour in range(history)
+    ], batch_size=batch_size)
+
+    Vendor.rebuild_all_metric_counters(vendor_ids=[vendor.pk for vendor in created_vendors])
+    return created_vendors
+
+
+def time_call(func, repeat=5):
+    """
+    Call `func` `repeat` times and return the timings in milliseconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def summarize(timings):
+    """
+    Summarize timings in milliseconds as median, p99 and ops/s.
+    """
+    ordered = sorted(timings)
+    p99 = ordered[min(len(ordered) - 1, int(round(0.99 * (len(ordered) - 1))))]
+    median = statistics.median(ordered)
+    return {
+        'runs': len(ordered),
+        'p50_ms': round(median, 3),
+        'p99_ms': round(p99, 3),
+        'ops_per_sec': round(1000 / median, 1) if median else None,
+    }
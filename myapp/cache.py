@@ -0,0 +1,118 @@
+"""
+Cache of vendor performance metrics and of authenticated users, kept up to date by the
+Vendor and User signals in models.py.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+VENDOR_METRICS_KEY = 'vendor-metrics:{}'
+HITS_KEY = 'vendor-metrics:hits'
+MISSES_KEY = 'vendor-metrics:misses'
+USER_KEY = 'auth-user:{}:{}'
+USER_VERSION_KEY = 'auth-user:{}:version'
+
+
+def _incr(key, delta=1):
+    """
+    Atomically add `delta` to a counter kept in the cache and return its new value.
+    """
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # counter not set yet (or evicted)
+        if cache.add(key, delta, timeout=None):
+            return delta
+        return cache.incr(key, delta)
+
+
+def get_vendor_metrics(vendor_id):
+    """
+    Return the cached metrics of a vendor, or None on a cache miss.
+    """
+    metrics = cache.get(VENDOR_METRICS_KEY.format(vendor_id))
+    _incr(MISSES_KEY if metrics is None else HITS_KEY)
+    return metrics
+
+
+def add_vendor_metrics(vendor_id, metrics):
+    """
+    Populate the cache after a miss without overwriting a value written concurrently by an update.
+    """
+    cache.add(VENDOR_METRICS_KEY.format(vendor_id), metrics, timeout=settings.VMS_METRICS_CACHE_TIMEOUT)
+
+
+def set_vendor_metrics(vendor_id, metrics):
+    """
+    Write updated metrics through to the cache once the current transaction commits.
+    """
+    transaction.on_commit(lambda: cache.set(
+        VENDOR_METRICS_KEY.format(vendor_id), metrics, timeout=settings.VMS_METRICS_CACHE_TIMEOUT))
+
+
+def set_many_vendor_metrics(metrics_by_vendor):
+    """
+    Write the updated metrics of many vendors (vendor id -> metrics) through to the cache on commit.
+    """
+    transaction.on_commit(lambda: cache.set_many(
+        {VENDOR_METRICS_KEY.format(vendor_id): metrics for vendor_id, metrics in metrics_by_vendor.items()},
+        timeout=settings.VMS_METRICS_CACHE_TIMEOUT))
+
+
+def delete_vendor_metrics(vendor_id):
+    """
+    Drop a vendor's metrics from the cache once the current transaction commits.
+    """
+    transaction.on_commit(lambda: cache.delete(VENDOR_METRICS_KEY.format(vendor_id)))
+
+
+def delete_many_vendor_metrics(vendor_ids):
+    """
+    Drop the metrics of many vendors from the cache right away.
+    """
+    cache.delete_many([VENDOR_METRICS_KEY.format(vendor_id) for vendor_id in vendor_ids])
+
+
+def cache_stats():
+    """
+    Return the hit and miss counters of the vendor metrics cache.
+    """
+    counters = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits, misses = counters.get(HITS_KEY, 0), counters.get(MISSES_KEY, 0)
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / (hits + misses) if hits + misses else 0,
+    }
+
+
+def get_cached_user(user_id):
+    """
+    Look up a cached user under the current version of its cache key.
+
+    Returns:
+    - tuple: The key to cache the user under after a lookup, and the cached user or None on
+      a cache miss. The key is taken before the lookup, so a user read before a change is
+      never cached under the version bumped by the change.
+    """
+    key = USER_KEY.format(user_id, cache.get(USER_VERSION_KEY.format(user_id), 0))
+    return key, cache.get(key)
+
+
+def cache_user(key, user):
+    """
+    Cache a user looked up for authentication for a short time.
+    """
+    cache.set(key, user, timeout=settings.VMS_AUTH_USER_CACHE_TIMEOUT)
+
+
+def invalidate_cached_user(user_id):
+    """
+    Bump the version of a user's cache key right away and again once the current transaction
+    commits, so a lookup made before the commit cannot leave the old state cached.
+
+    Queryset `update()` calls send no signals and must call this themselves.
+    """
+    key = USER_VERSION_KEY.format(user_id)
+    _incr(key)
+    transaction.on_commit(lambda: _incr(key))
@@ -0,0 +1,91 @@
+"""
+Conditional GET (ETag / Last-Modified) support for the generic views, based on `updated_at`.
+"""
+import hashlib
+from calendar import timegm
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+
+def updated_at_etag(versions, query_string):
+    """
+    Build a strong ETag from the (pk, updated_at) pairs of the returned rows and the query string.
+    """
+    digest = hashlib.md5(query_string.encode())
+    for pk, updated_at in versions:
+        digest.update(f'|{pk}@{updated_at.isoformat()}'.encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def is_conditional(request, last_modified=True):
+    return 'HTTP_IF_NONE_MATCH' in request.META or (last_modified and 'HTTP_IF_MODIFIED_SINCE' in request.META)
+
+
+class ConditionalGetMixin:
+    """
+    Mixin for generic views adding ETag and Last-Modified headers to GET responses and
+    answering conditional requests with 304 Not Modified.
+
+    Validators are derived from the `updated_at` column of the returned rows. When a request
+    carries `If-None-Match` or `If-Modified-Since`, only the primary keys and `updated_at` of
+    the rows are read to evaluate it, so unchanged resources are never loaded or serialized.
+
+    Lists only get an ETag: the newest `updated_at` on a page does not change when a row is
+    deleted or leaves the filter, so a Last-Modified date could not tell such a list changed.
+    """
+
+    def check_not_modified(self, request, versions, last_modified=True):
+        etag = updated_at_etag(versions, request.META.get('QUERY_STRING', ''))
+        timestamps = [updated_at for _, updated_at in versions]
+        # without a last modified date, If-Modified-Since is ignored
+        last_modified = timegm(max(timestamps).utctimetuple()) if last_modified and timestamps else None
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            self.set_validators(response, request, versions, last_modified=last_modified is not None)
+        return response
+
+    @staticmethod
+    def set_validators(response, request, versions, last_modified=True):
+        response['ETag'] = updated_at_etag(versions, request.META.get('QUERY_STRING', ''))
+        if last_modified and versions:
+            response['Last-Modified'] = http_date(timegm(max(updated_at for _, updated_at in versions).utctimetuple()))
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        if is_conditional(request):
+            lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+            updated_at = self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: lookup}).values_list('updated_at', flat=True).first()
+            if updated_at is not None:
+                not_modified = self.check_not_modified(request, [(lookup, updated_at)])
+                if not_modified is not None:
+                    return not_modified
+
+        instance = self.get_object()
+        serializer = self.get_serializer(instance)
+        return self.set_validators(Response(serializer.data), request, [(instance.pk, instance.updated_at)])
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.paginator is None:
+            return super().list(request, *args, **kwargs)
+
+        if is_conditional(request, last_modified=False):
+            # read the page with only the columns needed for the validators and the cursor
+            ordering = self.paginator.get_ordering(request, queryset, self)
+            fields = {queryset.model._meta.pk.name, 'updated_at'} | {field.lstrip('-') for field in ordering}
+            page = self.paginate_queryset(queryset.only(*fields))
+            not_modified = self.check_not_modified(
+                request, [(obj.pk, obj.updated_at) for obj in page], last_modified=False)
+            if not_modified is not None:
+                return not_modified
+            rows = queryset.in_bulk([obj.pk for obj in page])
+            page = [rows[obj.pk] for obj in page if obj.pk in rows]
+        else:
+            page = self.paginate_queryset(queryset)
+
+        serializer = self.get_serializer(page, many=True)
+        response = self.get_paginated_response(serializer.data)
+        return self.set_validators(response, request, [(obj.pk, obj.updated_at) for obj in page], last_modified=False)
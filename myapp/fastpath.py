@@ -0,0 +1,136 @@
+"""
+Read-only fast path for the list endpoints.
+
+Rows are read with `.values()` and converted with per-field functions compiled once per
+request from the serializer, instead of instantiating models and running the serializer
+for every row. The converted rows are plain JSON types, rendered by the regular
+JSONRenderer, so the response is byte-identical to the serializer output.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import ISO_8601, relations, serializers
+from rest_framework.settings import api_settings
+from rest_framework.response import Response
+
+from .metrics import serialize_timer
+
+
+def _identity(value):
+    return value
+
+
+# fields whose to_representation is equivalent to a builtin for non-null values
+SIMPLE_CONVERTERS = {
+    serializers.IntegerField: int,
+    serializers.FloatField: float,
+    serializers.BooleanField: bool,
+    serializers.CharField: str,
+    serializers.EmailField: str,
+    serializers.ReadOnlyField: _identity,
+}
+
+
+def datetime_converter(field):
+    """
+    Return a converter equivalent to DateTimeField.to_representation with the timezone
+    resolved once, or the field's own method for non-ISO formats.
+    """
+    if getattr(field, 'format', api_settings.DATETIME_FORMAT) not in (None, ISO_8601):
+        return field.to_representation
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if field_timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        if value.tzinfo is None:
+            return field.to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+
+    return convert
+
+
+def compile_converters(serializer, model):
+    """
+    Return a list of (field name, column, converter) for the fields of `serializer`, or None
+    if one of them cannot be computed from a single column of `model`.
+    """
+    converters = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, (serializers.BaseSerializer, serializers.SerializerMethodField,
+                              relations.ManyRelatedField)):
+            return None
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return None
+        if not model_field.concrete:
+            return None
+
+        if isinstance(field, relations.PrimaryKeyRelatedField):
+            # the column holds the primary key the field would return
+            converter = field.pk_field.to_representation if field.pk_field else _identity
+        elif isinstance(field, serializers.JSONField) and not field.binary:
+            converter = _identity
+        elif type(field) is serializers.DateTimeField:
+            converter = datetime_converter(field)
+        else:
+            converter = SIMPLE_CONVERTERS.get(type(field), field.to_representation)
+        converters.append((name, model_field.attname, converter))
+    return converters
+
+
+def convert_rows(rows, converters):
+    """
+    Convert `.values()` rows into the serializer representation.
+    """
+    return [
+        {name: None if row[column] is None else converter(row[column]) for name, column, converter in converters}
+        for row in rows
+    ]
+
+
+def is_fast(request):
+    return request.query_params.get('fast') in ('1', 'true', 'True')
+
+
+class FastListMixin:
+    """
+    Mixin for generic list views serving `?fast=1` from `.values()` rows.
+
+    Meant to be combined with ConditionalGetMixin, whose validators it sets as well.
+    Falls back to the regular list when the serializer has fields the fast path cannot compute.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if not is_fast(request):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        model = queryset.model
+        converters = compile_converters(self.get_serializer(), model)
+        if converters is None:
+            return super().list(request, *args, **kwargs)
+
+        pk = model._meta.pk.attname
+        columns = {pk, 'updated_at'} | {column for _, column, _ in converters}
+        if self.paginator is not None:
+            columns.update(field.lstrip('-') for field in self.paginator.get_ordering(request, queryset, self))
+            rows = self.paginate_queryset(queryset.values(*columns))
+        else:
+            rows = list(queryset.values(*columns))
+
+        versions = [(row[pk], row['updated_at']) for row in rows]
+        not_modified = self.check_not_modified(request, versions)
+        if not_modified is not None:
+            return not_modified
+
+        with serialize_timer():
+            results = convert_rows(rows, converters)
+        if self.paginator is not None:
+            response = self.get_paginated_response(results)
+        else:
+            response = Response(results)
+        return self.set_validators(response, request, versions)
@@ -0,0 +1,83 @@
+"""
+Sparse fieldsets: `?fields=` / `?exclude=` trimming both the serializer and the columns read from the database.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+
+
+class SparseFieldsSerializerMixin:
+    """
+    Serializer mixin accepting `fields` and `exclude` keyword arguments that restrict the
+    serialized fields to a subset of the declared ones.
+    """
+
+    def __init__(self, *args, fields=None, exclude=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        for name in exclude or ():
+            self.fields.pop(name, None)
+
+
+class SparseFieldsetMixin:
+    """
+    Mixin for generic views serving `?fields=a,b` (only these fields) and `?exclude=c`
+    (every field but these) on GET requests.
+
+    Besides trimming the serializer, the queryset is restricted with `.only()` to the
+    columns behind the requested fields (plus the primary key, `updated_at` and the
+    pagination ordering), so large columns such as `items` are not read unless requested.
+    """
+
+    def get_sparse_fields(self):
+        """
+        Return the (fields, exclude) lists requested for this request, or (None, None).
+        """
+        if getattr(self, '_sparse_fields', None) is None:
+            fields = exclude = None
+            if self.request is not None and self.request.method in ('GET', 'HEAD'):
+                params = self.request.query_params
+                available = set(self.get_serializer_class()().fields)
+                errors = {}
+                if params.get('fields'):
+                    fields = [name.strip() for name in params['fields'].split(',') if name.strip()]
+                if params.get('exclude'):
+                    exclude = [name.strip() for name in params['exclude'].split(',') if name.strip()]
+                for param, names in (('fields', fields), ('exclude', exclude)):
+                    unknown = [name for name in names or () if name not in available]
+                    if unknown:
+                        errors[param] = [f'Unknown field(s): {", ".join(unknown)}']
+                if errors:
+                    raise ValidationError(errors)
+            self._sparse_fields = (fields, exclude)
+        return self._sparse_fields
+
+    def get_serializer(self, *args, **kwargs):
+        fields, exclude = self.get_sparse_fields()
+        if fields is not None:
+            kwargs.setdefault('fields', fields)
+        if exclude is not None:
+            kwargs.setdefault('exclude', exclude)
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fields, exclude = self.get_sparse_fields()
+        if fields is None and exclude is None:
+            return queryset
+
+        serializer = self.get_serializer_class()(fields=fields, exclude=exclude)
+        model = queryset.model
+        columns = {model._meta.pk.name, 'updated_at'}
+        if self.paginator is not None and hasattr(self.paginator, 'get_ordering'):
+            columns.update(field.lstrip('-') for field in self.paginator.get_ordering(self.request, queryset, self))
+        for field in serializer.fields.values():
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                # computed fields may read any column
+                return queryset
+            if model_field.concrete:
+                columns.add(model_field.name)
+        return queryset.only(*columns)
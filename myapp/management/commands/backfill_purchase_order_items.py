@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from myapp.models import PurchaseOrder, PurchaseOrderItem
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the PurchaseOrderItem rows from the `items` of existing purchase orders, '
+            'a batch of orders per transaction. Safe to run again, e.g. after the migration '
+            'creating the table or to repair drift.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Purchase orders per transaction.')
+        parser.add_argument('--vendor-id', type=int, help='Only rebuild the orders of this vendor.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        purchase_orders = PurchaseOrder.objects.all()
+        if options['vendor_id'] is not None:
+            purchase_orders = purchase_orders.filter(vendor_id=options['vendor_id'])
+        written = PurchaseOrderItem.rebuild(purchase_orders, batch_size=options['batch_size'])
+        self.stdout.write(f'Wrote {written} line items for {purchase_orders.count()} purchase orders.')
@@ -0,0 +1,78 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from myapp.benchmarks import seed_dataset, summarize, time_call
+from myapp.models import HistoricalPerformance, PurchaseOrder, metric_aggregates
+
+
+def hot_queries(vendors, now):
+    """
+    Return the queries behind the metric, reminder, history and list hot paths.
+
+    The metric queries are the fused aggregate of `Vendor.rebuild_metric_counters` (which
+    runs it with `aggregate()`, the same query without the GROUP BY) and the batched GROUP BY
+    of `Vendor.rebuild_all_metric_counters`.
+    """
+    vendor = vendors[0]
+    return {
+        'metric_counters': PurchaseOrder.objects.filter(vendor=vendor).order_by().values(
+            'vendor_id').annotate(**metric_aggregates()),
+        'metric_counters_by_vendor': PurchaseOrder.objects.filter(vendor_id__in=[vendor.pk for vendor in vendors]).order_by().values(
+            'vendor_id').annotate(**metric_aggregates()),
+        'deadline_reminders': PurchaseOrder.objects.filter(reminder_due_at__lte=now),
+        'vendor_history': HistoricalPerformance.objects.filter(vendor=vendor).order_by('-date')[:100],
+        'purchase_orders_by_order_date': PurchaseOrder.objects.order_by('order_date', 'id')[:100],
+    }
+
+
+class Command(BaseCommand):
+    help = ('Seed a dataset and show query plans and timings of the hot-path queries '
+            'without and with the indexes from migration 0004. Everything is rolled back at the end.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendors', type=int, default=20)
+        parser.add_argument('--purchase-orders', type=int, default=5000, help='Purchase orders per vendor.')
+        parser.add_argument('--history', type=int, default=500, help='Hourly performance buckets per vendor.')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            vendors = seed_dataset(options['vendors'], options['purchase_orders'], options['history'])
+            self.analyze()
+            indexes = [(model, index) for model in (PurchaseOrder, HistoricalPerformance)
+                       for index in model._meta.indexes]
+            queries = hot_queries(vendors, timezone.now())
+
+            self.set_indexes(indexes, present=False)
+            before = self.measure(queries, options['repeat'])
+            self.set_indexes(indexes, present=True)
+            after = self.measure(queries, options['repeat'])
+
+            for name in queries:
+                self.stdout.write(self.style.MIGRATE_HEADING(name))
+                for label, results in (('without indexes', before), ('with indexes', after)):
+                    plan, timing = results[name]
+                    self.stdout.write(f'  {label}: p50 {timing["p50_ms"]} ms, p99 {timing["p99_ms"]} ms')
+                    for line in plan.splitlines():
+                        self.stdout.write(f'    {line}')
+            transaction.set_rollback(True)
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def set_indexes(self, indexes, present):
+        # plain SQL so this works inside the transaction on every backend
+        schema_editor = connection.schema_editor()
+        with connection.cursor() as cursor:
+            for model, index in indexes:
+                statement = index.create_sql(model, schema_editor) if present else index.remove_sql(model, schema_editor)
+                cursor.execute(str(statement))
+        self.analyze()
+
+    def measure(self, queries, repeat):
+        return {
+            name: (queryset.explain(), summarize(time_call(lambda: list(queryset.all()), repeat)))
+            for name, queryset in queries.items()
+        }
@@ -0,0 +1,139 @@
+import asyncio
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.backends.signals import connection_created
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from myapp.benchmarks import seed_dataset, summarize
+from myapp.cache import delete_many_vendor_metrics
+from myapp.models import Vendor
+
+
+class Command(BaseCommand):
+    help = ('Compare the throughput of the sync endpoints and their /api/async/ variants under '
+            'concurrent load, by calling the ASGI application in-process. --db-latency adds a '
+            'delay to every SQL query to simulate a remote database. The seeded data is committed '
+            'so the request threads can see it, and deleted at the end.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendors', type=int, default=20)
+        parser.add_argument('--purchase-orders', type=int, default=100, help='Purchase orders per vendor.')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per scenario.')
+        parser.add_argument('--concurrency', type=int, default=50, help='Requests in flight at once.')
+        parser.add_argument('--db-latency', type=float, default=0.0, help='Milliseconds added to every SQL query.')
+        parser.add_argument('--page-size', type=int, default=100, help='Page size of the list scenarios.')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError('--requests and --concurrency must be positive')
+        prefix = 'vms-async-bench'
+        self.vendors = seed_dataset(options['vendors'], options['purchase_orders'], history=1, prefix=prefix)
+        user = User.objects.create_user(username=prefix)
+        self.token = str(RefreshToken.for_user(user).access_token)
+        # connections are closed between requests, so every request thread gets a delayed one
+        latency = options['db_latency'] / 1000
+
+        def delay(execute, sql, params, many, context):
+            time.sleep(latency)
+            return execute(sql, params, many, context)
+
+        def add_latency(sender, connection, **kwargs):
+            connection.execute_wrappers.append(delay)
+
+        if latency:
+            connection_created.connect(add_latency, weak=False)
+        try:
+            results = asyncio.run(self.run_scenarios(options))
+        finally:
+            connection_created.disconnect(add_latency)
+            Vendor.objects.filter(vendor_code__startswith=f'{prefix}-').delete()
+            user.delete()
+            delete_many_vendor_metrics([vendor.pk for vendor in self.vendors])
+
+        report = json.dumps({
+            'dataset': {
+                'vendors': options['vendors'],
+                'purchase_orders_per_vendor': options['purchase_orders'],
+                'database': connection.vendor,
+            },
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'db_latency_ms': options['db_latency'],
+            'results': results,
+        }, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(report + '\n')
+        else:
+            self.stdout.write(report)
+
+    def scenarios(self, page_size):
+        vendor = self.vendors[0]
+        return {
+            'vendor_detail': (f'/api/vendors/{vendor.pk}/', ''),
+            'vendor_performance': (f'/api/vendors/{vendor.pk}/performance/', ''),
+            'purchase_order_list': ('/api/purchase_orders/', f'vendor_id={vendor.pk}&page_size={page_size}'),
+        }
+
+    async def run_scenarios(self, options):
+        self.application = get_asgi_application()
+        results = {}
+        for name, (path, query) in self.scenarios(options['page_size']).items():
+            for variant, variant_path in (('sync', path), ('async', '/api/async' + path[len('/api'):])):
+                results[f'{name}_{variant}'] = await self.run(
+                    variant_path, query, options['requests'], options['concurrency'])
+        return results
+
+    async def run(self, path, query, requests, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+        timings = []
+
+        async def one():
+            async with semaphore:
+                start = time.perf_counter()
+                status = await self.request(path, query)
+                timings.append((time.perf_counter() - start) * 1000)
+            if status >= 400:
+                raise CommandError(f'{path} failed with {status}')
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+        result = summarize(timings)
+        # with requests in flight concurrently, throughput is measured over the whole run
+        del result['ops_per_sec']
+        result['requests_per_sec'] = round(requests / elapsed, 1)
+        return result
+
+    async def request(self, path, query):
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': query.encode(),
+            'root_path': '',
+            'headers': [(b'host', b'127.0.0.1'), (b'authorization', f'Bearer {self.token}'.encode())],
+            'client': ('127.0.0.1', 0),
+            'server': ('127.0.0.1', 80),
+        }
+        response = {}
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+
+        await self.application(scope, receive, send)
+        return response['status']
@@ -0,0 +1,138 @@
+import json
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from myapp.benchmarks import seed_dataset, summarize
+from myapp.cache import delete_many_vendor_metrics
+from myapp.models import PurchaseOrder
+
+
+class Command(BaseCommand):
+    help = ('Seed a dataset and benchmark the purchase order, acknowledgement, list and performance '
+            'endpoints. Reports ops/s, p50/p99 latency and SQL queries per operation as JSON. '
+            'Everything is rolled back at the end unless --keep is given.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendors', type=int, default=20)
+        parser.add_argument('--purchase-orders', type=int, default=1000, help='Purchase orders per vendor.')
+        parser.add_argument('--history', type=int, default=100, help='Hourly performance buckets per vendor.')
+        parser.add_argument('--iterations', type=int, default=100, help='Requests per scenario.')
+        parser.add_argument('--page-size', type=int, default=100, help='Page size of the list scenarios.')
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            help='Only run the given scenario (repeatable).')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded data.')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(0)
+        self.page_size = options['page_size']
+        scenarios = self.scenarios()
+        selected = options['scenarios'] or list(scenarios)
+        unknown = set(selected) - set(scenarios)
+        if unknown:
+            raise CommandError(f'Unknown scenario(s): {", ".join(sorted(unknown))}')
+
+        with transaction.atomic():
+            start = time.perf_counter()
+            self.vendors = seed_dataset(options['vendors'], options['purchase_orders'], options['history'],
+                                        prefix='vms-bench')
+            seed_seconds = time.perf_counter() - start
+            self.client = APIClient(HTTP_HOST='127.0.0.1')
+            self.client.force_authenticate(User.objects.create_user(username='vms-bench'))
+
+            pending = PurchaseOrder.objects.filter(vendor__in=self.vendors, status='pending')
+            self.pending_ids = list(pending.values_list('pk', flat=True)[:options['iterations'] * 2])
+            self.unacknowledged_ids = list(PurchaseOrder.objects.filter(
+                vendor__in=self.vendors, acknowledgment_date__isnull=True).values_list(
+                'pk', flat=True)[:options['iterations']])
+
+            results = {name: self.run(name, scenarios[name], options['iterations']) for name in selected}
+            if not options['keep']:
+                transaction.set_rollback(True)
+        if not options['keep']:
+            delete_many_vendor_metrics([vendor.pk for vendor in self.vendors])
+
+        report = json.dumps({
+            'dataset': {
+                'vendors': options['vendors'],
+                'purchase_orders_per_vendor': options['purchase_orders'],
+                'history_per_vendor': options['history'],
+                'seed_seconds': round(seed_seconds, 3),
+                'database': connection.vendor,
+            },
+            'results': results,
+        }, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(report + '\n')
+        else:
+            self.stdout.write(report)
+
+    def scenarios(self):
+        return {
+            'purchase_order_create': self.create_purchase_order,
+            'purchase_order_update': self.update_purchase_order,
+            'purchase_order_complete': self.complete_purchase_order,
+            'purchase_order_acknowledge': self.acknowledge_purchase_order,
+            'vendor_list': lambda i: self.client.get(reverse('vendor-list'), {'page_size': self.page_size}),
+            'vendor_list_fast': lambda i: self.client.get(
+                reverse('vendor-list'), {'page_size': self.page_size, 'fast': 1}),
+            'purchase_order_list': lambda i: self.client.get(
+                reverse('purchaseorder-list'), {'vendor_id': self.vendor().pk, 'page_size': self.page_size}),
+            'purchase_order_list_fast': lambda i: self.client.get(
+                reverse('purchaseorder-list'), {'vendor_id': self.vendor().pk, 'page_size': self.page_size, 'fast': 1}),
+            'vendor_performance': lambda i: self.client.get(
+                reverse('vendor-performance', kwargs={'vendor_id': self.vendor().pk})),
+        }
+
+    def run(self, name, scenario, iterations):
+        timings, queries = [], []
+        for i in range(iterations):
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = scenario(i)
+                timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                raise CommandError(f'{name} failed with {response.status_code}: {response.content[:200]}')
+            queries.append(len(captured))
+        result = summarize(timings)
+        result['queries_per_op'] = round(sum(queries) / len(queries), 2)
+        return result
+
+    def vendor(self):
+        return self.rng.choice(self.vendors)
+
+    def create_purchase_order(self, i):
+        now = timezone.now()
+        return self.client.post(reverse('purchaseorder-list'), {
+            'po_number': f'vms-bench-new-{i}',
+            'vendor': self.vendor().pk,
+            'order_date': now,
+            'delivery_date': now + timezone.timedelta(days=7),
+            'items': [{'item_name': 'Item 1', 'quantity': 5}],
+            'quantity': 5,
+            'status': 'pending',
+            'issue_date': now,
+        }, format='json')
+
+    def update_purchase_order(self, i):
+        po_id = self.pending_ids[(2 * i + 1) % len(self.pending_ids)]
+        return self.client.patch(reverse('purchaseorder-detail', args=[po_id]),
+                                 {'quantity': self.rng.randint(1, 50)}, format='json')
+
+    def complete_purchase_order(self, i):
+        po_id = self.pending_ids[(2 * i) % len(self.pending_ids)]
+        return self.client.patch(reverse('purchaseorder-detail', args=[po_id]),
+                                 {'status': 'completed', 'quality_rating': 4.0}, format='json')
+
+    def acknowledge_purchase_order(self, i):
+        po_id = self.unacknowledged_ids[i % len(self.unacknowledged_ids)]
+        return self.client.post(reverse('acknowledge-purchaseorder', args=[po_id]))
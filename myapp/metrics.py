@@ -0,0 +1,269 @@
+"""
+Request and Celery task instrumentation, exposed in the Prometheus text format on `/metrics`.
+
+Request histograms are kept in the memory of each web process. Celery tasks run in
+worker processes, so their counters are kept in the Django cache instead.
+"""
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.cache import cache
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .cache import cache_stats, _incr
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+TASK_COUNT_KEY = 'task-metrics:{}:count'
+TASK_FAILURES_KEY = 'task-metrics:{}:failures'
+TASK_MICROSECONDS_KEY = 'task-metrics:{}:microseconds'
+TASK_SEEN_KEY = 'task-metrics:{}:seen'
+TASK_NAME_KEY = 'task-metrics:names:{}'
+TASK_NAME_COUNT_KEY = 'task-metrics:names:count'
+
+
+class Histogram:
+    """
+    A Prometheus histogram with a fixed label set, safe to update from several threads.
+    """
+
+    def __init__(self, name, documentation, labelnames, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        # label values -> [per bucket counts..., count, sum]
+        self.series = defaultdict(lambda: [0] * (len(buckets) + 1) + [0.0])
+
+    def observe(self, labels, value):
+        with self.lock:
+            series = self.series[labels]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def collect(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+        with self.lock:
+            series = {labels: list(values) for labels, values in self.series.items()}
+        for labels, values in sorted(series.items()):
+            label_text = ','.join(f'{name}="{value}"' for name, value in zip(self.labelnames, labels))
+            for bound, count in zip(self.buckets + ('+Inf',), values[:-2] + [values[-2]]):
+                yield f'{self.name}_bucket{{{label_text},le="{bound}"}} {count}'
+            yield f'{self.name}_count{{{label_text}}} {values[-2]}'
+            yield f'{self.name}_sum{{{label_text}}} {values[-1]}'
+
+    def reset(self):
+        with self.lock:
+            self.series.clear()
+
+
+REQUEST_LABELS = ('view', 'method', 'status')
+REQUEST_DURATION = Histogram(
+    'vms_request_duration_seconds', 'Total request latency.', REQUEST_LABELS, LATENCY_BUCKETS)
+REQUEST_DB_DURATION = Histogram(
+    'vms_request_db_duration_seconds', 'Time spent executing SQL per request.', REQUEST_LABELS, LATENCY_BUCKETS)
+REQUEST_SERIALIZE_DURATION = Histogram(
+    'vms_request_serialize_duration_seconds', 'Time spent serializing and rendering the response per request.',
+    REQUEST_LABELS, LATENCY_BUCKETS)
+REQUEST_QUERIES = Histogram(
+    'vms_request_queries', 'Number of SQL queries per request.', REQUEST_LABELS, QUERY_BUCKETS)
+REQUEST_HISTOGRAMS = (REQUEST_DURATION, REQUEST_DB_DURATION, REQUEST_SERIALIZE_DURATION, REQUEST_QUERIES)
+
+
+class RequestTimings:
+    """
+    Timings collected while handling one request.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.serialize = 0.0
+        self.serializing = False
+
+
+current_timings = ContextVar('current_timings', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper adding every query to the timings of the current request.
+
+    Installed on every connection rather than per request, so that queries run by the
+    async ORM or by sync views under ASGI, in other threads, are counted as well.
+    """
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db += time.perf_counter() - start
+        timings.queries += 1
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def serialize_timer():
+    """
+    Add the time spent in the block to the serialization time of the current request.
+
+    Nested blocks are only counted once.
+    """
+    timings = current_timings.get()
+    if timings is None or timings.serializing:
+        yield
+        return
+    timings.serializing = True
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.serialize += time.perf_counter() - start
+        timings.serializing = False
+
+
+class TimedSerializerMixin:
+    """
+    Serializer mixin counting `to_representation` towards the serialization time of the request.
+    """
+
+    def to_representation(self, instance):
+        with serialize_timer():
+            return super().to_representation(instance)
+
+
+class RequestMetricsMiddleware:
+    """
+    Record the SQL query count, SQL time, serialization time and total latency of every
+    request into the request histograms, and report them in a `Server-Timing` header.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.record(request, response, timings, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.record(request, response, timings, time.perf_counter() - start)
+
+    def record(self, request, response, timings, total):
+        match = request.resolver_match
+        labels = (match.view_name if match else 'unmatched', request.method, str(response.status_code))
+        REQUEST_DURATION.observe(labels, total)
+        REQUEST_DB_DURATION.observe(labels, timings.db)
+        REQUEST_SERIALIZE_DURATION.observe(labels, timings.serialize)
+        REQUEST_QUERIES.observe(labels, timings.queries)
+
+        response['Server-Timing'] = (
+            f'db;dur={timings.db * 1000:.2f};desc="{timings.queries} queries", '
+            f'serialize;dur={timings.serialize * 1000:.2f}, '
+            f'total;dur={total * 1000:.2f}'
+        )
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns; count rendering as serialization
+        timings = current_timings.get()
+        if timings is not None and hasattr(response, 'add_post_render_callback'):
+            start = time.perf_counter()
+
+            def rendered(response):
+                timings.serialize += time.perf_counter() - start
+
+            response.add_post_render_callback(rendered)
+        return response
+
+
+def record_task(name, seconds, failed=False):
+    """
+    Add one run of a Celery task to its shared counters.
+    """
+    # only cache.add and cache.incr are atomic: the first run of a task claims its name,
+    # then appends it to a list indexed by a counter
+    if cache.add(TASK_SEEN_KEY.format(name), True, timeout=None):
+        cache.set(TASK_NAME_KEY.format(_incr(TASK_NAME_COUNT_KEY)), name, timeout=None)
+    _incr(TASK_COUNT_KEY.format(name))
+    _incr(TASK_MICROSECONDS_KEY.format(name), int(seconds * 1_000_000))
+    if failed:
+        _incr(TASK_FAILURES_KEY.format(name))
+
+
+def collect_task_metrics():
+    name_keys = [TASK_NAME_KEY.format(index) for index in range(1, (cache.get(TASK_NAME_COUNT_KEY) or 0) + 1)]
+    # a name is appended again if its key was evicted
+    names = sorted(set(cache.get_many(name_keys).values()))
+    keys = []
+    for name in names:
+        keys += [TASK_COUNT_KEY.format(name), TASK_MICROSECONDS_KEY.format(name), TASK_FAILURES_KEY.format(name)]
+    values = cache.get_many(keys)
+    metrics = (
+        ('vms_celery_task_runs_total', 'counter', 'Number of finished Celery task runs.', TASK_COUNT_KEY, 1),
+        ('vms_celery_task_duration_seconds_total', 'counter', 'Total run time of Celery tasks.',
+         TASK_MICROSECONDS_KEY, 1_000_000),
+        ('vms_celery_task_failures_total', 'counter', 'Number of failed Celery task runs.', TASK_FAILURES_KEY, 1),
+    )
+    for metric, kind, documentation, key, scale in metrics:
+        yield f'# HELP {metric} {documentation}'
+        yield f'# TYPE {metric} {kind}'
+        for name in names:
+            yield f'{metric}{{task="{name}"}} {values.get(key.format(name), 0) / scale:g}'
+
+
+def render_metrics():
+    """
+    Return all metrics in the Prometheus text exposition format.
+    """
+    lines = []
+    for histogram in REQUEST_HISTOGRAMS:
+        lines.extend(histogram.collect())
+    lines.extend(collect_task_metrics())
+    stats = cache_stats()
+    lines += [
+        '# HELP vms_vendor_metrics_cache_hits_total Vendor performance metrics cache hits.',
+        '# TYPE vms_vendor_metrics_cache_hits_total counter',
+        f'vms_vendor_metrics_cache_hits_total {stats["hits"]}',
+        '# HELP vms_vendor_metrics_cache_misses_total Vendor performance metrics cache misses.',
+        '# TYPE vms_vendor_metrics_cache_misses_total counter',
+        f'vms_vendor_metrics_cache_misses_total {stats["misses"]}',
+    ]
+    return '\n'.join(lines) + '\n'
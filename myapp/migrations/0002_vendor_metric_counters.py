@@ -0,0 +1,95 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:43
+
+from django.db import migrations, models
+from django.db.models import Count, Sum, F, Q, DurationField, ExpressionWrapper
+from django.db.models.functions import TruncDate
+
+
+def backfill_metric_counters(apps, schema_editor):
+    Vendor = apps.get_model('myapp', 'Vendor')
+    PurchaseOrder = apps.get_model('myapp', 'PurchaseOrder')
+    completed = Q(status='completed')
+    for vendor in Vendor.objects.all().iterator():
+        totals = PurchaseOrder.objects.filter(vendor=vendor).aggregate(
+            total_po_count=Count('id'),
+            completed_po_count=Count('id', filter=completed),
+            on_time_po_count=Count('id', filter=completed & Q(
+                delivered_date__lte=TruncDate('delivery_date'))),
+            fulfilled_po_count=Count('id', filter=completed & Q(quality_rating__gt=0.0)),
+            quality_rating_sum=Sum('quality_rating', filter=completed),
+            quality_rating_count=Count('quality_rating', filter=completed),
+            response_time_sum=Sum(ExpressionWrapper(
+                F('acknowledgment_date') - F('issue_date'), output_field=DurationField())),
+            response_time_count=Count('acknowledgment_date'),
+        )
+        totals['quality_rating_sum'] = totals['quality_rating_sum'] or 0
+        totals['response_time_sum'] = (
+            totals['response_time_sum'].total_seconds() if totals['response_time_sum'] else 0)
+        for counter, value in totals.items():
+            setattr(vendor, counter, value)
+
+        vendor.on_time_delivery_rate = (
+            vendor.on_time_po_count / vendor.completed_po_count) * 100 if vendor.completed_po_count else 0
+        vendor.fulfillment_rate = (
+            vendor.fulfilled_po_count / vendor.total_po_count) * 100 if vendor.total_po_count else 0
+        vendor.quality_rating_avg = (
+            vendor.quality_rating_sum / vendor.quality_rating_count) if vendor.quality_rating_count else 0
+        vendor.average_response_time = round(
+            vendor.response_time_sum / vendor.response_time_count / 3600, 2) if vendor.response_time_count else 0
+        vendor.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendor',
+            name='completed_po_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='email',
+            field=models.EmailField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='fulfilled_po_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='on_time_po_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='quality_rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='quality_rating_sum',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='response_time_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='response_time_sum',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='total_po_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_metric_counters, migrations.RunPython.noop),
+    ]
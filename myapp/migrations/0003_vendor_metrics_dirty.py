@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0002_vendor_metric_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendor',
+            name='metrics_dirty',
+            field=models.BooleanField(default=False),
+        ),
+    ]
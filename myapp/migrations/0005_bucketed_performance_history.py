@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:50
+
+from django.db import migrations, models
+from django.db.models import Avg, Count
+from django.db.models.functions import TruncHour
+
+
+METRICS = ('on_time_delivery_rate', 'quality_rating_avg', 'average_response_time', 'fulfillment_rate')
+
+
+def merge_into_hourly_buckets(apps, schema_editor):
+    Vendor = apps.get_model('myapp', 'Vendor')
+    HistoricalPerformance = apps.get_model('myapp', 'HistoricalPerformance')
+    for vendor_id in Vendor.objects.values_list('id', flat=True).iterator():
+        records = HistoricalPerformance.objects.filter(vendor_id=vendor_id)
+        buckets = [
+            HistoricalPerformance(vendor_id=vendor_id, date=row['bucket'], granularity='hour',
+                                  samples=row['samples'], **{metric: row[metric] for metric in METRICS})
+            for row in records.annotate(bucket=TruncHour('date')).values('bucket').annotate(
+                samples=Count('id'), **{metric: Avg(metric) for metric in METRICS})
+        ]
+        records.delete()
+        HistoricalPerformance.objects.bulk_create(buckets)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0004_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalperformance',
+            name='granularity',
+            field=models.CharField(choices=[('hour', 'Hour'), ('day', 'Day'), ('month', 'Month')], default='hour', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='historicalperformance',
+            name='samples',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.RunPython(merge_into_hourly_buckets, migrations.RunPython.noop),
+    ]
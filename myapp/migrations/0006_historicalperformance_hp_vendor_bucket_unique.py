@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0005_bucketed_performance_history'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='historicalperformance',
+            constraint=models.UniqueConstraint(fields=('vendor', 'granularity', 'date'), name='hp_vendor_bucket_unique'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0006_historicalperformance_hp_vendor_bucket_unique'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='purchaseorder',
+            name='po_pending_delivery_idx',
+        ),
+        migrations.AddField(
+            model_name='purchaseorder',
+            name='reminder_sent_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(condition=models.Q(('reminder_sent_at__isnull', True), ('status', 'pending')), fields=['delivery_date'], name='po_unreminded_delivery_idx'),
+        ),
+    ]
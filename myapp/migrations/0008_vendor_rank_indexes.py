@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0007_purchaseorder_reminder_sent_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vendor',
+            index=models.Index(condition=models.Q(('completed_po_count__gt', 0)), fields=['on_time_delivery_rate', 'id'], name='vendor_on_time_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vendor',
+            index=models.Index(condition=models.Q(('quality_rating_count__gt', 0)), fields=['quality_rating_avg', 'id'], name='vendor_quality_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vendor',
+            index=models.Index(condition=models.Q(('response_time_count__gt', 0)), fields=['average_response_time', 'id'], name='vendor_response_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vendor',
+            index=models.Index(condition=models.Q(('total_po_count__gt', 0)), fields=['fulfillment_rate', 'id'], name='vendor_fulfillment_rank_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:17
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import ExpressionWrapper, F
+
+
+def backfill_reminder_due_at(apps, schema_editor):
+    PurchaseOrder = apps.get_model('myapp', 'PurchaseOrder')
+    PurchaseOrder.objects.filter(status='pending', reminder_sent_at__isnull=True).update(
+        reminder_due_at=ExpressionWrapper(
+            F('delivery_date') - timedelta(days=settings.VMS_REMINDER_LEAD_DAYS),
+            output_field=models.DateTimeField()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0010_email_outbox'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='purchaseorder',
+            name='po_unreminded_delivery_idx',
+        ),
+        migrations.AddField(
+            model_name='purchaseorder',
+            name='reminder_due_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_reminder_due_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(condition=models.Q(('reminder_due_at__isnull', False)), fields=['reminder_due_at'], name='po_reminder_due_idx'),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:20
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, Count, Sum, F, Q, When, DurationField, ExpressionWrapper
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def backfill_daily_metrics(apps, schema_editor):
+    PurchaseOrder = apps.get_model('myapp', 'PurchaseOrder')
+    VendorDailyMetrics = apps.get_model('myapp', 'VendorDailyMetrics')
+    since = timezone.localdate() - timedelta(days=max(settings.VMS_METRIC_WINDOWS) - 1)
+    completed = Q(status='completed')
+    order_day = Case(
+        When(status='completed', delivered_date__isnull=False, then=F('delivered_date')),
+        default=TruncDate('issue_date'), output_field=models.DateField())
+    days = {}
+    rows = PurchaseOrder.objects.order_by().annotate(day=order_day).filter(day__gte=since).values(
+        'vendor_id', 'day').annotate(
+        total_po_count=Count('id'),
+        completed_po_count=Count('id', filter=completed),
+        on_time_po_count=Count('id', filter=completed & Q(delivered_date__lte=TruncDate('delivery_date'))),
+        fulfilled_po_count=Count('id', filter=completed & Q(quality_rating__gt=0.0)),
+        quality_rating_sum=Sum('quality_rating', filter=completed),
+        quality_rating_count=Count('quality_rating', filter=completed),
+    )
+    for row in rows:
+        key = (row.pop('vendor_id'), row.pop('day'))
+        row['quality_rating_sum'] = row['quality_rating_sum'] or 0
+        days[key] = VendorDailyMetrics(vendor_id=key[0], date=key[1], **row)
+    rows = PurchaseOrder.objects.order_by().annotate(day=TruncDate('acknowledgment_date')).filter(
+        day__gte=since).values('vendor_id', 'day').annotate(
+        response_time_sum=Sum(ExpressionWrapper(
+            F('acknowledgment_date') - F('issue_date'), output_field=DurationField())),
+        response_time_count=Count('acknowledgment_date'),
+    )
+    for row in rows:
+        key = (row['vendor_id'], row['day'])
+        daily = days.setdefault(key, VendorDailyMetrics(vendor_id=key[0], date=key[1]))
+        daily.response_time_sum = row['response_time_sum'].total_seconds() if row['response_time_sum'] else 0
+        daily.response_time_count = row['response_time_count']
+    VendorDailyMetrics.objects.bulk_create(days.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0011_purchaseorder_reminder_due_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorDailyMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('total_po_count', models.IntegerField(default=0)),
+                ('completed_po_count', models.IntegerField(default=0)),
+                ('on_time_po_count', models.IntegerField(default=0)),
+                ('fulfilled_po_count', models.IntegerField(default=0)),
+                ('quality_rating_sum', models.FloatField(default=0)),
+                ('quality_rating_count', models.IntegerField(default=0)),
+                ('response_time_sum', models.FloatField(default=0)),
+                ('response_time_count', models.IntegerField(default=0)),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='myapp.vendor')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='vendordailymetrics',
+            constraint=models.UniqueConstraint(fields=('vendor', 'date'), name='vdm_vendor_date_unique'),
+        ),
+        migrations.RunPython(backfill_daily_metrics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,84 @@
+from django.db import migrations
+
+# GIN trigram indexes serving the ILIKE matches of myapp.search; built concurrently so
+# existing tables stay writable while they are built.
+POSTGRESQL_FORWARDS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS vendor_name_trgm_idx "
+    "ON myapp_vendor USING gin (name gin_trgm_ops)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS vendor_code_trgm_idx "
+    "ON myapp_vendor USING gin (vendor_code gin_trgm_ops)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS po_number_trgm_idx "
+    "ON myapp_purchaseorder USING gin (po_number gin_trgm_ops)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS po_item_names_trgm_idx "
+    "ON myapp_purchaseorder USING gin ((jsonb_path_query_array(items, '$[*].item_name')::text) gin_trgm_ops)",
+]
+POSTGRESQL_BACKWARDS = [
+    "DROP INDEX CONCURRENTLY IF EXISTS vendor_name_trgm_idx",
+    "DROP INDEX CONCURRENTLY IF EXISTS vendor_code_trgm_idx",
+    "DROP INDEX CONCURRENTLY IF EXISTS po_number_trgm_idx",
+    "DROP INDEX CONCURRENTLY IF EXISTS po_item_names_trgm_idx",
+]
+
+PO_ITEM_NAMES = (
+    "(SELECT group_concat(json_extract(value, '$.item_name'), ' ') "
+    "FROM json_each(new.items) WHERE type = 'object')"
+)
+
+# FTS5 trigram tables, keyed by the id of the indexed row and kept in sync by triggers
+SQLITE_FORWARDS = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS myapp_vendor_search USING fts5(name, vendor_code, tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS myapp_vendor_search_insert AFTER INSERT ON myapp_vendor BEGIN "
+    "INSERT INTO myapp_vendor_search (rowid, name, vendor_code) VALUES (new.id, new.name, new.vendor_code); END",
+    "CREATE TRIGGER IF NOT EXISTS myapp_vendor_search_update AFTER UPDATE OF name, vendor_code ON myapp_vendor BEGIN "
+    "UPDATE myapp_vendor_search SET name = new.name, vendor_code = new.vendor_code WHERE rowid = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS myapp_vendor_search_delete AFTER DELETE ON myapp_vendor BEGIN "
+    "DELETE FROM myapp_vendor_search WHERE rowid = old.id; END",
+    "INSERT INTO myapp_vendor_search (rowid, name, vendor_code) SELECT id, name, vendor_code FROM myapp_vendor",
+
+    "CREATE VIRTUAL TABLE IF NOT EXISTS myapp_purchaseorder_search USING fts5(po_number, item_names, tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS myapp_purchaseorder_search_insert AFTER INSERT ON myapp_purchaseorder BEGIN "
+    f"INSERT INTO myapp_purchaseorder_search (rowid, po_number, item_names) VALUES (new.id, new.po_number, {PO_ITEM_NAMES}); END",
+    "CREATE TRIGGER IF NOT EXISTS myapp_purchaseorder_search_update AFTER UPDATE OF po_number, items ON myapp_purchaseorder BEGIN "
+    f"UPDATE myapp_purchaseorder_search SET po_number = new.po_number, item_names = {PO_ITEM_NAMES} WHERE rowid = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS myapp_purchaseorder_search_delete AFTER DELETE ON myapp_purchaseorder BEGIN "
+    "DELETE FROM myapp_purchaseorder_search WHERE rowid = old.id; END",
+    "INSERT INTO myapp_purchaseorder_search (rowid, po_number, item_names) SELECT id, po_number, "
+    f"{PO_ITEM_NAMES.replace('new.items', 'myapp_purchaseorder.items')} FROM myapp_purchaseorder",
+]
+SQLITE_BACKWARDS = [
+    "DROP TRIGGER IF EXISTS myapp_vendor_search_insert",
+    "DROP TRIGGER IF EXISTS myapp_vendor_search_update",
+    "DROP TRIGGER IF EXISTS myapp_vendor_search_delete",
+    "DROP TABLE IF EXISTS myapp_vendor_search",
+    "DROP TRIGGER IF EXISTS myapp_purchaseorder_search_insert",
+    "DROP TRIGGER IF EXISTS myapp_purchaseorder_search_update",
+    "DROP TRIGGER IF EXISTS myapp_purchaseorder_search_delete",
+    "DROP TABLE IF EXISTS myapp_purchaseorder_search",
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    statements = {'postgresql': POSTGRESQL_FORWARDS, 'sqlite': SQLITE_FORWARDS}
+    # other databases have no index, myapp.search falls back to scans there
+    for statement in statements.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(statement, params=None)
+
+
+def drop_search_indexes(apps, schema_editor):
+    statements = {'postgresql': POSTGRESQL_BACKWARDS, 'sqlite': SQLITE_BACKWARDS}
+    for statement in statements.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(statement, params=None)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('myapp', '0012_vendor_daily_metrics'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0013_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PurchaseOrderItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sku', models.CharField(max_length=255)),
+                ('quantity', models.IntegerField()),
+                ('purchase_order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='line_items', to='myapp.purchaseorder')),
+                ('vendor', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='myapp.vendor')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['sku', 'vendor'], name='poi_sku_vendor_idx'), models.Index(fields=['vendor', 'sku'], name='poi_vendor_sku_idx')],
+            },
+        ),
+    ]
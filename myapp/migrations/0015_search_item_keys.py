@@ -0,0 +1,71 @@
+from django.db import migrations
+
+# Items are stored either as a list of {"item_name": ...} objects or as an object keyed by
+# item name ({"bags": 10}); the item names of both shapes are indexed.
+POSTGRESQL_ITEM_NAMES = (
+    "(CASE jsonb_typeof(items) WHEN 'object' THEN jsonb_path_query_array(items, '$.keyvalue().key') "
+    "ELSE jsonb_path_query_array(items, '$[*].item_name') END)::text"
+)
+POSTGRESQL_OLD_ITEM_NAMES = "(jsonb_path_query_array(items, '$[*].item_name')::text)"
+
+POSTGRESQL_FORWARDS = [
+    "DROP INDEX CONCURRENTLY IF EXISTS po_item_names_trgm_idx",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS po_item_names_trgm_idx "
+    f"ON myapp_purchaseorder USING gin (({POSTGRESQL_ITEM_NAMES}) gin_trgm_ops)",
+]
+POSTGRESQL_BACKWARDS = [
+    "DROP INDEX CONCURRENTLY IF EXISTS po_item_names_trgm_idx",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS po_item_names_trgm_idx "
+    f"ON myapp_purchaseorder USING gin ({POSTGRESQL_OLD_ITEM_NAMES} gin_trgm_ops)",
+]
+
+PO_ITEM_NAMES = (
+    "(CASE json_type(new.items) "
+    "WHEN 'object' THEN (SELECT group_concat(key, ' ') FROM json_each(new.items)) "
+    "ELSE (SELECT group_concat(json_extract(value, '$.item_name'), ' ') "
+    "FROM json_each(new.items) WHERE type = 'object') END)"
+)
+PO_OLD_ITEM_NAMES = (
+    "(SELECT group_concat(json_extract(value, '$.item_name'), ' ') "
+    "FROM json_each(new.items) WHERE type = 'object')"
+)
+
+
+def sqlite_statements(item_names):
+    # recreate the purchase order triggers of 0013_search_indexes and reindex every order
+    return [
+        "DROP TRIGGER IF EXISTS myapp_purchaseorder_search_insert",
+        "DROP TRIGGER IF EXISTS myapp_purchaseorder_search_update",
+        "CREATE TRIGGER myapp_purchaseorder_search_insert AFTER INSERT ON myapp_purchaseorder BEGIN "
+        f"INSERT INTO myapp_purchaseorder_search (rowid, po_number, item_names) VALUES (new.id, new.po_number, {item_names}); END",
+        "CREATE TRIGGER myapp_purchaseorder_search_update AFTER UPDATE OF po_number, items ON myapp_purchaseorder BEGIN "
+        f"UPDATE myapp_purchaseorder_search SET po_number = new.po_number, item_names = {item_names} WHERE rowid = old.id; END",
+        "DELETE FROM myapp_purchaseorder_search",
+        "INSERT INTO myapp_purchaseorder_search (rowid, po_number, item_names) SELECT id, po_number, "
+        f"{item_names.replace('new.items', 'myapp_purchaseorder.items')} FROM myapp_purchaseorder",
+    ]
+
+
+def index_item_keys(apps, schema_editor):
+    statements = {'postgresql': POSTGRESQL_FORWARDS, 'sqlite': sqlite_statements(PO_ITEM_NAMES)}
+    for statement in statements.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(statement, params=None)
+
+
+def unindex_item_keys(apps, schema_editor):
+    statements = {'postgresql': POSTGRESQL_BACKWARDS, 'sqlite': sqlite_statements(PO_OLD_ITEM_NAMES)}
+    for statement in statements.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(statement, params=None)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('myapp', '0014_purchaseorderitem'),
+    ]
+
+    operations = [
+        migrations.RunPython(index_item_keys, unindex_item_keys),
+    ]
@@ -1,8 +1,84 @@
-from django.db import models
-from django.db.models.signals import post_save
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import models, transaction, IntegrityError
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
-from django.db.models import Avg, F
+from django.db.models import Case, Count, Sum, F, Q, When, DurationField, ExpressionWrapper
+from django.db.models.functions import TruncDate, TruncDay, TruncMonth
+
+from django.contrib.auth.models import User
+
+from .cache import set_vendor_metrics, set_many_vendor_metrics, delete_vendor_metrics, invalidate_cached_user
+
+# Running counters kept on Vendor, adjusted by deltas whenever a PurchaseOrder
+# changes so that the metrics never need a scan of the vendor's order history.
+METRIC_COUNTERS = (
+    'total_po_count',
+    'completed_po_count',
+    'on_time_po_count',
+    'fulfilled_po_count',
+    'quality_rating_sum',
+    'quality_rating_count',
+    'response_time_sum',
+    'response_time_count',
+)
+
+# Counters that follow the acknowledgment of an order rather than its delivery.
+RESPONSE_COUNTERS = ('response_time_sum', 'response_time_count')
+
+# Performance metrics derived from the counters.
+PERFORMANCE_METRICS = (
+    'on_time_delivery_rate',
+    'quality_rating_avg',
+    'average_response_time',
+    'fulfillment_rate',
+)
+
+# PurchaseOrder fields that the counters are derived from.
+METRIC_SOURCE_FIELDS = (
+    'vendor_id',
+    'status',
+    'delivery_date',
+    'delivered_date',
+    'quality_rating',
+    'issue_date',
+    'acknowledgment_date',
+)
+
+# For each metric: the counter that must be non-zero for the metric to be defined,
+# and whether a higher value ranks better (leaderboard).
+METRIC_RANKING = {
+    'on_time_delivery_rate': ('completed_po_count', True),
+    'quality_rating_avg': ('quality_rating_count', True),
+    'average_response_time': ('response_time_count', False),
+    'fulfillment_rate': ('total_po_count', True),
+}
+
+
+def performance_metrics(counters):
+    """
+    Derive the four performance metrics from a mapping of counter name -> value.
+
+    Metrics without any data are 0.0, so they are always floats like the model fields.
+    """
+    completed_po_count = counters['completed_po_count']
+    total_po_count = counters['total_po_count']
+    quality_rating_count = counters['quality_rating_count']
+    response_time_count = counters['response_time_count']
+    return {
+        'on_time_delivery_rate': (
+            counters['on_time_po_count'] / completed_po_count) * 100 if completed_po_count != 0 else 0.0,
+        'quality_rating_avg': (
+            counters['quality_rating_sum'] / quality_rating_count) if quality_rating_count != 0 else 0.0,
+        #average_response_time in hours
+        'average_response_time': round(
+            counters['response_time_sum'] / response_time_count / 3600, 2) if response_time_count != 0 else 0.0,
+        'fulfillment_rate': (
+            counters['fulfilled_po_count'] / total_po_count) * 100 if total_po_count != 0 else 0.0,
+    }
 
 
 class Vendor(models.Model):
@@ -18,9 +94,125 @@ class Vendor(models.Model):
     average_response_time = models.FloatField(default=0)
     fulfillment_rate = models.FloatField(default=0)
 
+    # running counters backing the metrics above
+    total_po_count = models.PositiveIntegerField(default=0)
+    completed_po_count = models.PositiveIntegerField(default=0)
+    on_time_po_count = models.PositiveIntegerField(default=0)
+    fulfilled_po_count = models.PositiveIntegerField(default=0)
+    quality_rating_sum = models.FloatField(default=0)
+    quality_rating_count = models.PositiveIntegerField(default=0)
+    response_time_sum = models.FloatField(default=0)  # in seconds
+    response_time_count = models.PositiveIntegerField(default=0)
+    # set while a background recompute is pending (VMS_METRICS_ASYNC mode)
+    metrics_dirty = models.BooleanField(default=False)
+    # last change of the fields exposed by the API (ETag / Last-Modified)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # leaderboard rankings, over the vendors each metric is defined for
+        indexes = [
+            models.Index(fields=['on_time_delivery_rate', 'id'], condition=Q(completed_po_count__gt=0),
+                         name='vendor_on_time_rank_idx'),
+            models.Index(fields=['quality_rating_avg', 'id'], condition=Q(quality_rating_count__gt=0),
+                         name='vendor_quality_rank_idx'),
+            models.Index(fields=['average_response_time', 'id'], condition=Q(response_time_count__gt=0),
+                         name='vendor_response_rank_idx'),
+            models.Index(fields=['fulfillment_rate', 'id'], condition=Q(total_po_count__gt=0),
+                         name='vendor_fulfillment_rank_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
+    def refresh_rates(self):
+        """
+        Derive the four performance metrics from the running counters.
+        """
+        self.__dict__.update(performance_metrics(self.__dict__))
+
+    @classmethod
+    def apply_metric_delta(cls, vendor_id, delta):
+        """
+        Add `delta` (counter name -> change) to a vendor's counters and refresh its metrics.
+
+        The vendor row is locked for the duration of the update so concurrent
+        PurchaseOrder saves cannot lose each other's increments. Costs a constant
+        number of queries regardless of how many orders the vendor has.
+
+        Returns:
+            Vendor: The updated vendor.
+        """
+        with transaction.atomic():
+            vendor = cls.objects.select_for_update().get(pk=vendor_id)
+            for counter, change in delta.items():
+                setattr(vendor, counter, getattr(vendor, counter) + change)
+            vendor.refresh_rates()
+            vendor.save(update_fields=METRIC_COUNTERS + PERFORMANCE_METRICS)
+        return vendor
+
+    def rebuild_metric_counters(self):
+        """
+        Recompute the counters from scratch with a single aggregate query.
+
+        Only needed to repair drift or backfill; regular saves go through `apply_metric_delta`.
+        """
+        self.__dict__.update(metric_counters(PurchaseOrder.objects.filter(vendor=self)))
+        self.refresh_rates()
+
+    @classmethod
+    def rebuild_all_metric_counters(cls, vendor_ids=None, batch_size=1000):
+        """
+        Recompute the counters and metrics of many vendors, one GROUP BY query per batch.
+
+        Rebuilds every vendor unless `vendor_ids` is given. Each batch of vendors is locked
+        while its counters are recomputed and written back with `bulk_update`, and its
+        daily counters are rebuilt as well. The rebuilt vendors are no longer dirty.
+
+        Returns:
+            list: The vendors whose metrics changed.
+        """
+        vendors = cls.objects.order_by('pk')
+        if vendor_ids is not None:
+            vendors = vendors.filter(pk__in=vendor_ids)
+        ids = list(vendors.values_list('pk', flat=True))
+        empty = dict.fromkeys(METRIC_COUNTERS, 0)
+        changed = []
+        for start in range(0, len(ids), batch_size):
+            batch_ids = ids[start:start + batch_size]
+            with transaction.atomic():
+                batch = list(cls.objects.select_for_update().filter(pk__in=batch_ids))
+                counters = metric_counters_by_vendor(PurchaseOrder.objects.filter(vendor_id__in=batch_ids))
+                for vendor in batch:
+                    previous_metrics = [getattr(vendor, metric) for metric in PERFORMANCE_METRICS]
+                    vendor.__dict__.update(counters.get(vendor.pk, empty))
+                    vendor.refresh_rates()
+                    vendor.metrics_dirty = False
+                    if previous_metrics != [getattr(vendor, metric) for metric in PERFORMANCE_METRICS]:
+                        changed.append(vendor)
+                cls.objects.bulk_update(batch, METRIC_COUNTERS + PERFORMANCE_METRICS + ('metrics_dirty',))
+                VendorDailyMetrics.rebuild(batch_ids)
+                # bulk_update sends no post_save, refresh the cache here
+                set_many_vendor_metrics({
+                    vendor.pk: {metric: getattr(vendor, metric) for metric in PERFORMANCE_METRICS}
+                    for vendor in batch
+                })
+        return changed
+
+    @classmethod
+    def mark_metrics_dirty(cls, vendor_id):
+        """
+        Flag a vendor for background recomputation of its metrics.
+
+        Only the change that flips the flag schedules the Celery task, so a burst of
+        PurchaseOrder updates for one vendor results in a single recompute. A failed publish
+        is logged rather than raised, the committed write stands and the
+        `requeue_dirty_vendor_metrics` sweep schedules the recompute later.
+        """
+        if cls.objects.filter(pk=vendor_id, metrics_dirty=False).update(metrics_dirty=True):
+            from .tasks import recompute_vendor_metrics
+            transaction.on_commit(lambda: recompute_vendor_metrics.apply_async(
+                (vendor_id,), countdown=settings.VMS_METRICS_DEBOUNCE_SECONDS), robust=True)
+
 
 class PurchaseOrder(models.Model):
     '''
@@ -51,28 +243,535 @@ class PurchaseOrder(models.Model):
     quality_rating = models.FloatField(null=True, blank=True)
     issue_date = models.DateTimeField()
     acknowledgment_date = models.DateTimeField(null=True, blank=True)
+    reminder_sent_at = models.DateTimeField(null=True, blank=True)  # last delivery deadline reminder
+    # when the deadline reminder is due, null once it is sent or no longer needed
+    reminder_due_at = models.DateTimeField(null=True, blank=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)  # ETag / Last-Modified
+
+    class Meta:
+        indexes = [
+            # vendor metric aggregates; quality ratings are only read for completed
+            # orders, so one index covers both the status and the quality filters
+            models.Index(fields=['vendor', 'status', 'quality_rating'], name='po_vendor_status_quality_idx'),
+            models.Index(fields=['vendor', 'acknowledgment_date'], name='po_vendor_ack_idx'),
+            # only orders still waiting for their deadline reminder, earliest first
+            models.Index(fields=['reminder_due_at'], condition=Q(reminder_due_at__isnull=False),
+                         name='po_reminder_due_idx'),
+            # keyset pagination by order date
+            models.Index(fields=['order_date', 'id'], name='po_order_date_idx'),
+        ]
 
     def __str__(self):
         return self.po_number
 
+    def save(self, *args, **kwargs):
+        # the previous metric state is read under a row lock in pre_save; keep it until the
+        # vendor counters are updated in post_save
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def set_derived_fields(self):
+        """
+        Fill the fields derived from the others: stamp the delivery date of completed orders
+        and keep the due time of the deadline reminder current.
+
+        Run by the pre_save receiver; call it directly before `bulk_create`, which sends no signals.
+        """
+        if self.status == 'completed' and self.delivered_date is None:
+            self.delivered_date = timezone.localdate()
+        self.reminder_due_at = self.reminder_due()
+
+    def reminder_due(self):
+        """
+        Return when the delivery deadline reminder of this order is due, or None if the
+        order is not pending or was already reminded.
+        """
+        if self.status != 'pending' or self.reminder_sent_at is not None:
+            return None
+        return self.delivery_date - timedelta(days=settings.VMS_REMINDER_LEAD_DAYS)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remember what the vendor counters currently include for this order
+        deferred = instance.get_deferred_fields()
+        if not deferred.intersection(METRIC_SOURCE_FIELDS):
+            instance._metric_state = instance.metric_state()
+        # and what its line items hold
+        if not deferred.intersection(('vendor_id', 'items')):
+            instance._line_items_state = instance.line_items_state()
+        return instance
+
+    def line_item_values(self):
+        """
+        Return (sku, quantity) for each entry of `items` with a SKU and an integer quantity.
+
+        `items` is either a list of objects, whose SKU is their `sku`, or their `item_name`
+        when they have none, or an object mapping each SKU to its quantity ({"bags": 10}).
+        """
+        if isinstance(self.items, dict):
+            entries = self.items.items()
+        elif isinstance(self.items, list):
+            entries = [(item.get('sku') or item.get('item_name'), item.get('quantity'))
+                       for item in self.items if isinstance(item, dict)]
+        else:
+            entries = ()
+        return [
+            (str(sku)[:255], quantity) for sku, quantity in entries
+            if sku and isinstance(quantity, int) and not isinstance(quantity, bool)
+        ]
+
+    def line_items_state(self):
+        return self.vendor_id, tuple(self.line_item_values())
+
+    def metric_state(self):
+        """
+        Return the values of the fields the vendor metrics depend on.
+        """
+        return tuple(getattr(self, field) for field in METRIC_SOURCE_FIELDS)
+
+
+class PurchaseOrderItem(models.Model):
+    """
+    One line of a PurchaseOrder's `items`, so that quantities per SKU can be aggregated in SQL.
+
+    The rows are rewritten whenever the order's items or vendor change, and can be rebuilt
+    with the `backfill_purchase_order_items` command.
+    """
+    purchase_order = models.ForeignKey(PurchaseOrder, on_delete=models.CASCADE, related_name='line_items')
+    # copied from the order for the per-vendor aggregates, indexed below
+    vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE, db_index=False)
+    sku = models.CharField(max_length=255)
+    quantity = models.IntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sku', 'vendor'], name='poi_sku_vendor_idx'),
+            models.Index(fields=['vendor', 'sku'], name='poi_vendor_sku_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.sku} x {self.quantity}"
+
+    @classmethod
+    def for_orders(cls, purchase_orders):
+        """
+        Return the unsaved line items of saved purchase orders.
+        """
+        return [
+            cls(purchase_order_id=purchase_order.pk, vendor_id=purchase_order.vendor_id, sku=sku, quantity=quantity)
+            for purchase_order in purchase_orders
+            for sku, quantity in purchase_order.line_item_values()
+        ]
+
+    @classmethod
+    def rebuild(cls, purchase_orders, batch_size=1000):
+        """
+        Rewrite the line items of the orders in a PurchaseOrder queryset, one batch of orders
+        (and one transaction) at a time.
+
+        Returns:
+            int: The number of line items written.
+        """
+        purchase_orders = purchase_orders.only('pk', 'vendor_id', 'items').order_by('pk')
+        written = 0
+        last_pk = 0
+        while True:
+            batch = list(purchase_orders.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                return written
+            with transaction.atomic():
+                cls.objects.filter(purchase_order__in=[purchase_order.pk for purchase_order in batch]).delete()
+                written += len(cls.objects.bulk_create(cls.for_orders(batch)))
+            last_pk = batch[-1].pk
+
+
+def _local_date(value):
+    return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+
+
+def metric_contribution(state):
+    """
+    Return how much a PurchaseOrder in the given `metric_state` adds to its vendor's counters.
+    """
+    _, status, delivery_date, delivered_date, quality_rating, issue_date, acknowledgment_date = state
+    contribution = dict.fromkeys(METRIC_COUNTERS, 0)
+    contribution['total_po_count'] = 1
+
+    if status == 'completed':
+        contribution['completed_po_count'] = 1
+        if delivered_date is not None:
+            if isinstance(delivered_date, datetime):
+                delivered_date = _local_date(delivered_date)
+            if delivered_date <= _local_date(delivery_date):
+                contribution['on_time_po_count'] = 1
+        if quality_rating is not None:
+            contribution['quality_rating_sum'] = quality_rating
+            contribution['quality_rating_count'] = 1
+            if quality_rating > 0.0:
+                contribution['fulfilled_po_count'] = 1
+
+    if acknowledgment_date is not None and issue_date is not None:
+        contribution['response_time_sum'] = (acknowledgment_date - issue_date).total_seconds()
+        contribution['response_time_count'] = 1
+
+    return contribution
+
+
+def metric_contribution_by_day(state):
+    """
+    Split the contribution of a PurchaseOrder in the given `metric_state` over the days it counts on.
+
+    The delivery counters count the order on the day it was delivered, or on the day it was
+    issued while it is not delivered; the response time counters on the day it was acknowledged.
+
+    Returns:
+        dict: Local date -> counters.
+    """
+    _, status, delivery_date, delivered_date, quality_rating, issue_date, acknowledgment_date = state
+    contribution = metric_contribution(state)
+    if status == 'completed' and delivered_date is not None:
+        day = _local_date(delivered_date) if isinstance(delivered_date, datetime) else delivered_date
+    else:
+        day = _local_date(issue_date)
+    days = {day: {counter: 0 if counter in RESPONSE_COUNTERS else value for counter, value in contribution.items()}}
+    if contribution['response_time_count']:
+        acknowledged = days.setdefault(_local_date(acknowledgment_date), dict.fromkeys(METRIC_COUNTERS, 0))
+        for counter in RESPONSE_COUNTERS:
+            acknowledged[counter] += contribution[counter]
+    return days
+
+
+def metric_aggregates():
+    """
+    Return the conditional aggregates computing every vendor counter in one pass over the orders.
+    """
+    completed = Q(status='completed')
+    return {
+        'total_po_count': Count('id'),
+        'completed_po_count': Count('id', filter=completed),
+        'on_time_po_count': Count('id', filter=completed & Q(
+            delivered_date__lte=TruncDate('delivery_date'))),
+        'fulfilled_po_count': Count('id', filter=completed & Q(quality_rating__gt=0.0)),
+        'quality_rating_sum': Sum('quality_rating', filter=completed),
+        'quality_rating_count': Count('quality_rating', filter=completed),
+        'response_time_sum': Sum(ExpressionWrapper(
+            F('acknowledgment_date') - F('issue_date'), output_field=DurationField())),
+        'response_time_count': Count('acknowledgment_date'),
+    }
+
+
+def _counter_values(totals):
+    counters = {counter: totals[counter] for counter in METRIC_COUNTERS}
+    counters['quality_rating_sum'] = counters['quality_rating_sum'] or 0
+    response_time_sum = counters['response_time_sum']
+    counters['response_time_sum'] = response_time_sum.total_seconds() if response_time_sum else 0
+    return counters
+
+
+def metric_counters(purchase_orders):
+    """
+    Aggregate the vendor counters over a PurchaseOrder queryset in a single query.
+    """
+    return _counter_values(purchase_orders.aggregate(**metric_aggregates()))
+
+
+def metric_counters_by_vendor(purchase_orders):
+    """
+    Aggregate the counters of every vendor in a PurchaseOrder queryset with a single GROUP BY query.
+
+    Returns:
+        dict: Vendor id -> counters. Vendors without orders in the queryset are missing.
+    """
+    rows = purchase_orders.order_by().values('vendor_id').annotate(**metric_aggregates())
+    return {row['vendor_id']: _counter_values(row) for row in rows}
+
+
+def daily_metric_counters(purchase_orders, since):
+    """
+    Aggregate the daily counters of a PurchaseOrder queryset from the date `since` on, with
+    one GROUP BY query for the delivery counters and one for the response time counters.
+
+    Returns:
+        dict: (vendor id, date) -> counters.
+    """
+    aggregates = metric_aggregates()
+    order_day = Case(
+        When(status='completed', delivered_date__isnull=False, then=F('delivered_date')),
+        default=TruncDate('issue_date'), output_field=models.DateField())
+    days = defaultdict(lambda: dict.fromkeys(METRIC_COUNTERS, 0))
+    rows = purchase_orders.order_by().annotate(day=order_day).filter(day__gte=since).values(
+        'vendor_id', 'day').annotate(
+        **{counter: aggregates[counter] for counter in METRIC_COUNTERS if counter not in RESPONSE_COUNTERS})
+    for row in rows:
+        counters = days[row['vendor_id'], row['day']]
+        for counter in METRIC_COUNTERS:
+            if counter not in RESPONSE_COUNTERS:
+                counters[counter] = row[counter] or 0
+    rows = purchase_orders.order_by().annotate(day=TruncDate('acknowledgment_date')).filter(
+        day__gte=since).values('vendor_id', 'day').annotate(
+        **{counter: aggregates[counter] for counter in RESPONSE_COUNTERS})
+    for row in rows:
+        counters = days[row['vendor_id'], row['day']]
+        counters['response_time_sum'] = row['response_time_sum'].total_seconds() if row['response_time_sum'] else 0
+        counters['response_time_count'] = row['response_time_count']
+    return days
+
+
+class VendorDailyMetrics(models.Model):
+    """
+    A vendor's metric counters for one day, so that its metrics over a recent window are a
+    sum over at most one row per day instead of a scan of its orders.
+
+    The rows follow the PurchaseOrder changes with the same deltas as the counters on
+    Vendor (see `metric_contribution_by_day` for the day an order counts on). Days before
+    the longest window in `VMS_METRIC_WINDOWS` are not kept.
+    """
+    vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE)
+    date = models.DateField()
+    total_po_count = models.IntegerField(default=0)
+    completed_po_count = models.IntegerField(default=0)
+    on_time_po_count = models.IntegerField(default=0)
+    fulfilled_po_count = models.IntegerField(default=0)
+    quality_rating_sum = models.FloatField(default=0)
+    quality_rating_count = models.IntegerField(default=0)
+    response_time_sum = models.FloatField(default=0)  # in seconds
+    response_time_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # also serves the window sums of a vendor
+            models.UniqueConstraint(fields=['vendor', 'date'], name='vdm_vendor_date_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.vendor_id} - {self.date}"
+
+    @staticmethod
+    def window_start(days):
+        """
+        Return the first day of a window of `days` days ending today.
+        """
+        return timezone.localdate() - timedelta(days=days - 1)
+
+    @classmethod
+    def retention_start(cls):
+        return cls.window_start(max(settings.VMS_METRIC_WINDOWS))
+
+    @classmethod
+    def window_metrics(cls, vendor_id, days):
+        """
+        Return a vendor's performance metrics over the last `days` days, from its daily rows.
+        """
+        totals = cls.objects.filter(vendor_id=vendor_id, date__gte=cls.window_start(days)).aggregate(
+            **{counter: Sum(counter) for counter in METRIC_COUNTERS})
+        return performance_metrics({counter: value or 0 for counter, value in totals.items()})
+
+    @classmethod
+    def apply_deltas(cls, deltas):
+        """
+        Add `deltas` ((vendor id, date) -> counter name -> change) to the daily rows.
+
+        Each row is changed with a single UPDATE, and created when it does not exist yet.
+        Days before the retention start are skipped.
+        """
+        start = cls.retention_start()
+        for (vendor_id, day), delta in sorted(deltas.items()):
+            changes = {counter: change for counter, change in delta.items() if change}
+            if day < start or not changes:
+                continue
+            current = cls.objects.filter(vendor_id=vendor_id, date=day)
+            increments = {counter: F(counter) + change for counter, change in changes.items()}
+            if current.update(**increments):
+                continue
+            try:
+                with transaction.atomic():
+                    cls.objects.create(vendor_id=vendor_id, date=day, **changes)
+            except IntegrityError:
+                # created concurrently, add to it instead
+                current.update(**increments)
+
+    @classmethod
+    def rebuild(cls, vendor_ids):
+        """
+        Recompute the daily rows of the given vendors from their orders.
+        """
+        days = daily_metric_counters(PurchaseOrder.objects.filter(vendor_id__in=vendor_ids), cls.retention_start())
+        with transaction.atomic():
+            cls.objects.filter(vendor_id__in=vendor_ids).delete()
+            cls.objects.bulk_create([
+                cls(vendor_id=vendor_id, date=day, **counters) for (vendor_id, day), counters in days.items()
+            ])
+
 
 class HistoricalPerformance(models.Model):
+    """
+    Vendor performance metrics aggregated over a time bucket.
+
+    Snapshots are merged into the hourly bucket they fall in, keeping the mean of the
+    metrics and the number of `samples` they were taken from. Old buckets are rolled up
+    into daily and monthly buckets by the `compact_performance_history` task.
+    """
+    GRANULARITY_CHOICES = (
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+        ('month', 'Month'),
+    )
     vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE)
-    date = models.DateTimeField()
+    date = models.DateTimeField()  # start of the bucket
+    granularity = models.CharField(max_length=10, choices=GRANULARITY_CHOICES, default='hour')
+    samples = models.PositiveIntegerField(default=1)
     on_time_delivery_rate = models.FloatField()
     quality_rating_avg = models.FloatField()
     average_response_time = models.FloatField()
     fulfillment_rate = models.FloatField()
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['vendor', 'granularity', 'date'], name='hp_vendor_bucket_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['vendor', 'date'], name='hp_vendor_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.vendor.name} - {self.date}"
 
+    @classmethod
+    def roll_up(cls, source, target, cutoff):
+        """
+        Merge `source` granularity buckets starting before `cutoff` into `target` granularity buckets.
+
+        Metrics are averaged weighted by their samples, so repeated roll-ups give the same
+        result as averaging the original snapshots.
+
+        Returns:
+            int: The number of source buckets removed.
+        """
+        trunc = {'day': TruncDay, 'month': TruncMonth}[target]
+        old_buckets = cls.objects.filter(granularity=source, date__lt=cutoff)
+        with transaction.atomic():
+            rolled_up = old_buckets.annotate(bucket=trunc('date')).values('vendor_id', 'bucket').annotate(
+                total_samples=Sum('samples'),
+                **{metric: Sum(F(metric) * F('samples')) for metric in PERFORMANCE_METRICS},
+            )
+            existing = {
+                (bucket.vendor_id, bucket.date): bucket
+                for bucket in cls.objects.filter(
+                    granularity=target, date__in={row['bucket'] for row in rolled_up})
+            }
+            to_create, to_update = [], []
+            for row in rolled_up:
+                bucket = existing.get((row['vendor_id'], row['bucket']))
+                if bucket is None:
+                    bucket = cls(vendor_id=row['vendor_id'], date=row['bucket'], granularity=target, samples=0,
+                                 **dict.fromkeys(PERFORMANCE_METRICS, 0))
+                    to_create.append(bucket)
+                else:
+                    to_update.append(bucket)
+                samples = bucket.samples + row['total_samples']
+                for metric in PERFORMANCE_METRICS:
+                    setattr(bucket, metric, (getattr(bucket, metric) * bucket.samples + row[metric]) / samples)
+                bucket.samples = samples
+            cls.objects.bulk_create(to_create)
+            cls.objects.bulk_update(to_update, PERFORMANCE_METRICS + ('samples',))
+            removed, _ = old_buckets.delete()
+        return removed
+
+
+def record_performance(vendor):
+    """
+    Merge the vendor's current metrics into the historical performance bucket of the current hour.
+    """
+    bucket = timezone.localtime().replace(minute=0, second=0, microsecond=0)
+    current = HistoricalPerformance.objects.filter(vendor=vendor, granularity='hour', date=bucket)
+    # running mean over the snapshots taken in this hour
+    merge = {
+        metric: (F(metric) * F('samples') + getattr(vendor, metric)) / (F('samples') + 1)
+        for metric in PERFORMANCE_METRICS
+    }
+    if current.update(samples=F('samples') + 1, **merge):
+        return
+    try:
+        with transaction.atomic():
+            HistoricalPerformance.objects.create(
+                vendor=vendor,
+                date=bucket,
+                granularity='hour',
+                on_time_delivery_rate=vendor.on_time_delivery_rate,
+                quality_rating_avg=vendor.quality_rating_avg,
+                average_response_time=vendor.average_response_time,
+                fulfillment_rate=vendor.fulfillment_rate
+            )
+    except IntegrityError:
+        # created concurrently, merge into it instead
+        current.update(samples=F('samples') + 1, **merge)
+
+
+class EmailOutbox(models.Model):
+    """
+    An email waiting to be sent, or the record of one that was.
+
+    Emails are stored in the same transaction as the change they announce and sent by the
+    `drain_email_outbox` task, which retries failed deliveries with exponential backoff.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+    recipient = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['next_attempt_at', 'id'], condition=Q(status='pending'), name='outbox_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.recipient} ({self.status})"
+
+
+@receiver(pre_save, sender=PurchaseOrder)
+def capture_previous_metric_state(sender, instance, raw=False, **kwargs):
+    """
+    Stamp the delivery date of completed orders, make sure the previous metric state is known,
+    reset the deadline reminder when the delivery date changes and keep its due time current.
+    """
+    if instance._state.adding:
+        instance._metric_state = None
+    else:
+        # lock the row and read what the counters currently include for it: the state loaded
+        # with the instance may already have been replaced by a concurrent save
+        previous = sender.objects.select_for_update().filter(pk=instance.pk).values_list(
+            *METRIC_SOURCE_FIELDS).first()
+        instance._metric_state = tuple(previous) if previous else None
+
+    # a moved deadline deserves a new reminder
+    previous_state = instance._metric_state
+    if previous_state is not None and previous_state[METRIC_SOURCE_FIELDS.index('delivery_date')] != instance.delivery_date:
+        instance.reminder_sent_at = None
+    instance.set_derived_fields()
+
 
 @receiver(post_save, sender=PurchaseOrder)
 def update_on_time_delivery_rate(sender, instance, created, **kwargs):
     """
     Update vendor performance metrics after a PurchaseOrder is modified.
 
+    Only the difference between the order's previous and new state is applied to the
+    vendor's running counters and daily counters, so the cost does not grow with the
+    vendor's history.
+    With `VMS_METRICS_ASYNC` enabled the vendor is only marked dirty and the metrics
+    are recomputed by the `recompute_vendor_metrics` Celery task.
+
     Args:
         sender: The model class.
         instance: The actual instance being saved.
@@ -82,51 +781,100 @@ def update_on_time_delivery_rate(sender, instance, created, **kwargs):
     Returns:
         None
     """
+    previous_state = getattr(instance, '_metric_state', None)
+    new_state = instance.metric_state()
+    instance._metric_state = new_state
+    if previous_state == new_state:
+        return
 
-    vendor = instance.vendor
-
-    if instance.status == 'completed':
-        # Calculate on_time_delivery_rate
-        instance.delivered_date = timezone.now()
-        completed_pos = PurchaseOrder.objects.filter(
-            vendor=vendor, status='completed')
-        total_completed_pos = completed_pos.count()
-        on_time_deliveries = completed_pos.filter(
-            delivered_date__lte=F('delivery_date')).count()
-        on_time_delivery_rate = (
-            on_time_deliveries / total_completed_pos) * 100 if total_completed_pos != 0 else 0
-        vendor.on_time_delivery_rate = on_time_delivery_rate
-
-        # Calculate fulfillment_rate
-        total_pos = PurchaseOrder.objects.filter(vendor=vendor).count()
-        fulfilled_pos = PurchaseOrder.objects.filter(
-            vendor=vendor, quality_rating__gt=0.0, status='completed').count()
-        vendor.fulfillment_rate = (
-            fulfilled_pos / total_pos) * 100 if total_pos != 0 else 0
-
-        # Calculate quality_rating_avg
-        quality_rating_avg = PurchaseOrder.objects.filter(vendor=vendor, quality_rating__isnull=False, status='completed').aggregate(
-            Avg('quality_rating'))['quality_rating__avg'] or 0
-        vendor.quality_rating_avg = quality_rating_avg
-
-    # Calculate average_response_time
-    response_times = PurchaseOrder.objects.filter(vendor=vendor, acknowledgment_date__isnull=False, issue_date__isnull=False).annotate(
-        response_time=F('acknowledgment_date') - F('issue_date')).aggregate(Avg('response_time'))['response_time__avg']
-    if response_times is not None:
-        response_time_seconds = response_times.total_seconds()
-        #average_response_time in hours
-        vendor.average_response_time = round(response_time_seconds / 3600, 2)
-    else:
-        vendor.average_response_time = 0
-
-    vendor.save()
-
-    # Create historical performance record
-    HistoricalPerformance.objects.create(
-        vendor=vendor,
-        date=timezone.now(),
-        on_time_delivery_rate=vendor.on_time_delivery_rate,
-        quality_rating_avg=vendor.quality_rating_avg,
-        average_response_time=vendor.average_response_time,
-        fulfillment_rate=vendor.fulfillment_rate
-    )
+    deltas = {}
+    if previous_state is not None:
+        for counter, value in metric_contribution(previous_state).items():
+            deltas.setdefault(previous_state[0], {}).setdefault(counter, 0)
+            deltas[previous_state[0]][counter] -= value
+    for counter, value in metric_contribution(new_state).items():
+        deltas.setdefault(new_state[0], {}).setdefault(counter, 0)
+        deltas[new_state[0]][counter] += value
+
+    daily_deltas = {}
+    if previous_state is not None:
+        for day, contribution in metric_contribution_by_day(previous_state).items():
+            delta = daily_deltas.setdefault((previous_state[0], day), dict.fromkeys(METRIC_COUNTERS, 0))
+            for counter, value in contribution.items():
+                delta[counter] -= value
+    for day, contribution in metric_contribution_by_day(new_state).items():
+        delta = daily_deltas.setdefault((new_state[0], day), dict.fromkeys(METRIC_COUNTERS, 0))
+        for counter, value in contribution.items():
+            delta[counter] += value
+
+    for vendor_id, delta in deltas.items():
+        if settings.VMS_METRICS_ASYNC:
+            Vendor.mark_metrics_dirty(vendor_id)
+            continue
+        vendor = Vendor.apply_metric_delta(vendor_id, delta)
+        # Create historical performance record
+        record_performance(vendor)
+    if not settings.VMS_METRICS_ASYNC:
+        # after the vendor rows, so concurrent saves lock in the same order
+        VendorDailyMetrics.apply_deltas(daily_deltas)
+
+
+@receiver(post_save, sender=PurchaseOrder)
+def sync_line_items(sender, instance, created, **kwargs):
+    """
+    Rewrite the PurchaseOrderItem rows of an order when its items or vendor changed.
+    """
+    state = instance.line_items_state()
+    if not created and getattr(instance, '_line_items_state', None) == state:
+        return
+    if not created:
+        PurchaseOrderItem.objects.filter(purchase_order=instance).delete()
+    line_items = PurchaseOrderItem.for_orders([instance])
+    if line_items:
+        PurchaseOrderItem.objects.bulk_create(line_items)
+    instance._line_items_state = state
+
+
+@receiver(post_delete, sender=PurchaseOrder)
+def remove_from_vendor_metrics(sender, instance, origin=None, **kwargs):
+    """
+    Take a deleted PurchaseOrder out of its vendor's counters.
+    """
+    # the vendor itself is being deleted, its counters go with it
+    if isinstance(origin, Vendor) or getattr(origin, 'model', None) is Vendor:
+        return
+
+    previous_state = getattr(instance, '_metric_state', None) or instance.metric_state()
+    if settings.VMS_METRICS_ASYNC:
+        Vendor.mark_metrics_dirty(previous_state[0])
+        return
+    delta = {counter: -value for counter, value in metric_contribution(previous_state).items()}
+    vendor = Vendor.apply_metric_delta(previous_state[0], delta)
+    record_performance(vendor)
+    VendorDailyMetrics.apply_deltas({
+        (previous_state[0], day): {counter: -value for counter, value in contribution.items()}
+        for day, contribution in metric_contribution_by_day(previous_state).items()
+    })
+
+
+@receiver(post_save, sender=Vendor)
+def cache_vendor_metrics(sender, instance, update_fields=None, **kwargs):
+    """
+    Write a vendor's metrics through to the cache whenever they are saved.
+    """
+    if update_fields is None or set(update_fields).intersection(PERFORMANCE_METRICS):
+        set_vendor_metrics(instance.pk, {metric: getattr(instance, metric) for metric in PERFORMANCE_METRICS})
+
+
+@receiver(post_delete, sender=Vendor)
+def uncache_vendor_metrics(sender, instance, **kwargs):
+    delete_vendor_metrics(instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def uncache_user(sender, instance, **kwargs):
+    """
+    Drop a changed or deleted user from the authentication cache.
+    """
+    invalidate_cached_user(instance.pk)
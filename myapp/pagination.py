@@ -0,0 +1,31 @@
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor based pagination keyed on `id`.
+
+    Each page is fetched with a `WHERE id > <cursor> ORDER BY id LIMIT <page_size>` style
+    query, so time and memory stay proportional to the page size at any depth.
+    The page size defaults to `REST_FRAMEWORK['PAGE_SIZE']` and can be changed per request
+    with `?page_size=` up to `max_page_size`.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    ordering = ('id',)
+
+
+class PurchaseOrderKeysetPagination(KeysetPagination):
+    """
+    Keyset pagination for purchase orders, optionally keyed on `order_date` with `?ordering=`.
+    """
+    ordering_param = 'ordering'
+    orderings = {
+        'id': ('id',),
+        '-id': ('-id',),
+        'order_date': ('order_date', 'id'),
+        '-order_date': ('-order_date', '-id'),
+    }
+
+    def get_ordering(self, request, queryset, view):
+        return self.orderings.get(request.query_params.get(self.ordering_param), self.ordering)
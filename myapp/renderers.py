@@ -0,0 +1,75 @@
+import csv
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class StreamingRenderer(BaseRenderer):
+    """
+    Base class of the export renderers.
+
+    Exports stream their rows with `stream()`; `render()` is only used for small payloads
+    returned instead of an export (error responses are rendered as JSON by the export view).
+    """
+    charset = 'utf-8'
+    # bytes buffered before a chunk is handed to the server
+    chunk_bytes = 64 * 1024
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not isinstance(data, dict):
+            data = {'detail': data}
+        return b''.join(self.stream(list(data), [list(data.values())]))
+
+    def stream(self, header, rows):
+        """
+        Encode `rows` (sequences aligned with `header`) lazily, yielding bytes in chunks.
+        """
+        buffer = []
+        size = 0
+        for line in self.lines(header, rows):
+            buffer.append(line)
+            size += len(line)
+            if size >= self.chunk_bytes:
+                yield ''.join(buffer).encode(self.charset)
+                buffer = []
+                size = 0
+        if buffer:
+            yield ''.join(buffer).encode(self.charset)
+
+    def lines(self, header, rows):
+        raise NotImplementedError
+
+
+class CSVRenderer(StreamingRenderer):
+    """
+    CSV with a header row. JSON values (e.g. `items`) are JSON-encoded and missing values are empty.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+
+    class LineBuffer:
+        def write(self, line):
+            return line
+
+    def lines(self, header, rows):
+        writer = csv.writer(self.LineBuffer())
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow([
+                json.dumps(value) if isinstance(value, (dict, list)) else value
+                for value in row
+            ])
+
+
+class NDJSONRenderer(StreamingRenderer):
+    """
+    Newline delimited JSON, one object per row.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def lines(self, header, rows):
+        for row in rows:
+            yield json.dumps(dict(zip(header, row))) + '\n'
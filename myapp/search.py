@@ -0,0 +1,105 @@
+"""
+Ranked substring search over vendors (name, vendor_code) and purchase orders (po_number,
+item names, or the keys of `items` given as an object), backed by a trigram index on each
+database:
+
+- PostgreSQL: `pg_trgm` GIN indexes on the searched columns, matched with ILIKE and
+  ranked by `word_similarity`.
+- SQLite: FTS5 tables with the trigram tokenizer, kept in sync with the searched tables
+  by triggers and ranked by `bm25`.
+
+The indexes are created by the `0013_search_indexes` and `0015_search_item_keys` migrations.
+Trigram indexes can only be used for queries of at least MIN_QUERY_LENGTH characters.
+"""
+from django.db import connection
+from django.db.models import Q
+
+from .models import Vendor, PurchaseOrder
+
+MIN_QUERY_LENGTH = 3
+
+RESULT_TYPES = ('vendor', 'purchase_order')
+
+# the item names of a purchase order, whether `items` is a list of {"item_name": ...} objects
+# or an object keyed by item name; must match the po_item_names_trgm_idx expression
+POSTGRESQL_ITEM_NAMES = (
+    "(CASE jsonb_typeof(items) WHEN 'object' THEN jsonb_path_query_array(items, '$.keyvalue().key') "
+    "ELSE jsonb_path_query_array(items, '$[*].item_name') END)::text"
+)
+
+POSTGRESQL_QUERIES = {
+    'vendor': """
+        SELECT 'vendor', id, name,
+               GREATEST(word_similarity(%(query)s, name), word_similarity(%(query)s, vendor_code)) AS score
+        FROM myapp_vendor
+        WHERE name ILIKE %(pattern)s OR vendor_code ILIKE %(pattern)s
+    """,
+    'purchase_order': f"""
+        SELECT 'purchase_order', id, po_number,
+               GREATEST(word_similarity(%(query)s, po_number),
+                        word_similarity(%(query)s, {POSTGRESQL_ITEM_NAMES})) AS score
+        FROM myapp_purchaseorder
+        WHERE po_number ILIKE %(pattern)s OR {POSTGRESQL_ITEM_NAMES} ILIKE %(pattern)s
+    """,
+}
+
+SQLITE_QUERIES = {
+    'vendor': """
+        SELECT 'vendor', rowid, name, -bm25(myapp_vendor_search) AS score
+        FROM myapp_vendor_search WHERE myapp_vendor_search MATCH %(query)s
+    """,
+    'purchase_order': """
+        SELECT 'purchase_order', rowid, po_number, -bm25(myapp_purchaseorder_search) AS score
+        FROM myapp_purchaseorder_search WHERE myapp_purchaseorder_search MATCH %(query)s
+    """,
+}
+
+
+def _like_pattern(query):
+    escaped = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def _fts_phrase(query):
+    # a quoted FTS5 string is matched as a substring by the trigram tokenizer
+    return '"{}"'.format(query.replace('"', '""'))
+
+
+def _fallback_search(query, types, limit, offset):
+    # no trigram index on this database: plain scans, unranked
+    results = []
+    if 'vendor' in types:
+        results += [('vendor', pk, label, 1.0) for pk, label in Vendor.objects.filter(
+            Q(name__icontains=query) | Q(vendor_code__icontains=query)).values_list('pk', 'name')]
+    if 'purchase_order' in types:
+        results += [('purchase_order', pk, label, 1.0) for pk, label in PurchaseOrder.objects.filter(
+            Q(po_number__icontains=query) | Q(items__icontains=query)).values_list('pk', 'po_number')]
+    results.sort(key=lambda result: (result[0], result[1]))
+    return results[offset:offset + limit]
+
+
+def search(query, types=RESULT_TYPES, limit=20, offset=0):
+    """
+    Search vendors and purchase orders containing `query`, best matches first.
+
+    Parameters:
+    - query (str): The text to search, at least MIN_QUERY_LENGTH characters.
+    - types: The result types to search, a subset of RESULT_TYPES.
+    - limit (int), offset (int): The page of results to return.
+
+    Returns:
+    - list: (type, id, label, score) tuples, ordered by descending score.
+    """
+    if connection.vendor == 'postgresql':
+        queries, params = POSTGRESQL_QUERIES, {'query': query, 'pattern': _like_pattern(query)}
+    elif connection.vendor == 'sqlite':
+        queries, params = SQLITE_QUERIES, {'query': _fts_phrase(query)}
+    else:
+        return _fallback_search(query, types, limit, offset)
+
+    sql = ' UNION ALL '.join(queries[result_type] for result_type in types)
+    params.update(limit=limit, offset=offset)
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT * FROM ({sql}) AS results ORDER BY 4 DESC, 1, 2 '
+                       f'LIMIT %(limit)s OFFSET %(offset)s', params)
+        return [tuple(row) for row in cursor.fetchall()]
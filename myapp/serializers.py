@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from .models import *
 from django.contrib.auth.models import User
+from .metrics import TimedSerializerMixin
+from .fieldsets import SparseFieldsSerializerMixin
 
 class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -19,14 +21,54 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 
-class VendorSerializer(serializers.ModelSerializer):
+class VendorSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Vendor
         #fields = "__all__"
         fields = ['id', 'name', 'contact_details', 'address', 'vendor_code' , 'email']
 
+    def update(self, instance, validated_data):
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        # only write the edited columns: a full save would overwrite the metric counters
+        # that PurchaseOrder saves update concurrently
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        return instance
 
-class PurchaseOrderSerializer(serializers.ModelSerializer):
+
+class PurchaseOrderSerializer(SparseFieldsSerializerMixin, TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = PurchaseOrder
-        fields = '__all__'
+        # the reminder due time is scheduling state; the reminder and modification
+        # timestamps are only ever set by the server
+        exclude = ['reminder_due_at']
+        read_only_fields = ['reminder_sent_at', 'updated_at']
+
+
+class PreloadedVendorField(serializers.PrimaryKeyRelatedField):
+    """
+    Vendor field resolving primary keys from the `vendors` dict in the serializer context
+    instead of issuing one query per row.
+    """
+
+    def to_internal_value(self, data):
+        try:
+            vendor = self.context['vendors'].get(int(data))
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if vendor is None:
+            self.fail('does_not_exist', pk_value=data)
+        return vendor
+
+
+class PurchaseOrderImportSerializer(PurchaseOrderSerializer):
+    """
+    PurchaseOrderSerializer for bulk imports.
+
+    Vendors are looked up from the context and `po_number` uniqueness is checked by the
+    caller for a whole chunk of rows at once.
+    """
+    vendor = PreloadedVendorField(queryset=Vendor.objects.all())
+
+    class Meta(PurchaseOrderSerializer.Meta):
+        extra_kwargs = {'po_number': {'validators': []}}
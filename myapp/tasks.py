@@ -1,51 +1,267 @@
 from celery import shared_task
-from django.core.mail import send_mail
+from celery.signals import task_prerun, task_postrun
+from django.core.mail import get_connection, EmailMessage
 from django.conf import settings
-from django.utils.timezone import now
-from .models import PurchaseOrder
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils.timezone import now, localtime
+from .models import PurchaseOrder, Vendor, VendorDailyMetrics, HistoricalPerformance, EmailOutbox, METRIC_COUNTERS, PERFORMANCE_METRICS, record_performance
 from datetime import timedelta
+from itertools import groupby
+from operator import attrgetter
+import time
+from .metrics import record_task
+
+_task_started = {}
+
+
+@task_prerun.connect
+def start_task_timer(task_id=None, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def record_task_duration(task_id=None, task=None, state=None, **kwargs):
+    """
+    Add the run time of every finished task to the counters exposed on `/metrics`.
+    """
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        record_task(task.name, time.perf_counter() - started, failed=state == 'FAILURE')
+
 
 @shared_task
 def send_vendor_notification_email(email, subject, message):
     """
-    Task to send an email notification to the vendor asynchronously.
+    Task to queue an email notification to the vendor in the email outbox.
+
+    Kept for messages already published under this name; new code calls `queue_emails`.
     """
-    send_mail(
-        subject=subject,
-        message=message,
-        from_email=settings.EMAIL_HOST_USER,
-        recipient_list=[email],
-        fail_silently=False,
-    )
+    with transaction.atomic():
+        queue_emails([EmailOutbox(recipient=email, subject=subject, body=message)])
+
+@shared_task
+def recompute_vendor_metrics(vendor_id):
+    """
+    Task to recompute a vendor's metrics after it was marked dirty.
+    """
+    # clear the flag first so changes made while recomputing schedule another run
+    Vendor.objects.filter(pk=vendor_id).update(metrics_dirty=False)
+    vendor = Vendor.objects.filter(pk=vendor_id).first()
+    if vendor is None:
+        return
+
+    vendor.rebuild_metric_counters()
+    vendor.save(update_fields=METRIC_COUNTERS + PERFORMANCE_METRICS)
+    VendorDailyMetrics.rebuild([vendor_id])
+    record_performance(vendor)
+
+@shared_task
+def requeue_dirty_vendor_metrics():
+    """
+    Task to schedule a recompute for every vendor still marked dirty, e.g. because the
+    broker was unavailable when the change was committed.
+
+    Returns:
+        int: The number of vendors rescheduled.
+    """
+    vendor_ids = list(Vendor.objects.filter(metrics_dirty=True).values_list('pk', flat=True))
+    for vendor_id in vendor_ids:
+        recompute_vendor_metrics.delay(vendor_id)
+    return len(vendor_ids)
+
+@shared_task
+def refresh_all_vendor_metrics():
+    """
+    Task to recompute the metrics of every vendor from scratch, repairing any counter drift.
+    """
+    for vendor in Vendor.rebuild_all_metric_counters():
+        record_performance(vendor)
 
 @shared_task
-def send_delivery_deadline_reminders():
+def compact_performance_history():
     """
-    Sends reminders to vendors for Purchase Orders with upcoming delivery deadlines.
+    Task to downsample old performance history and drop buckets past retention.
+
+    Hourly buckets older than `VMS_HISTORY_HOURLY_RETENTION_DAYS` are rolled up into daily
+    buckets, daily buckets older than `VMS_HISTORY_DAILY_RETENTION_DAYS` into monthly
+    buckets, and monthly buckets older than `VMS_HISTORY_MONTHLY_RETENTION_DAYS` are deleted.
+    Daily vendor counters that fell out of the longest metric window are deleted as well.
+    """
+    today = localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    # cutoffs are aligned to the target bucket so a bucket is only ever rolled up whole
+    HistoricalPerformance.roll_up(
+        'hour', 'day', today - timedelta(days=settings.VMS_HISTORY_HOURLY_RETENTION_DAYS))
+    HistoricalPerformance.roll_up(
+        'day', 'month', (today - timedelta(days=settings.VMS_HISTORY_DAILY_RETENTION_DAYS)).replace(day=1))
+    HistoricalPerformance.objects.filter(
+        granularity='month',
+        date__lt=today - timedelta(days=settings.VMS_HISTORY_MONTHLY_RETENTION_DAYS),
+    ).delete()
+    VendorDailyMetrics.objects.filter(date__lt=VendorDailyMetrics.retention_start()).delete()
+
+def next_reminder_due():
+    """
+    Return the earliest due time of a pending deadline reminder, or None if there is none.
+
+    A single probe of the `reminder_due_at` index, so polling it is cheap.
+    """
+    return PurchaseOrder.objects.filter(reminder_due_at__isnull=False).order_by(
+        'reminder_due_at').values_list('reminder_due_at', flat=True).first()
+
+
+@shared_task
+def send_delivery_deadline_reminders(batch_size=100):
+    """
+    Sends reminders to vendors for Purchase Orders whose reminder is due.
+
+    Each order's reminder falls due `VMS_REMINDER_LEAD_DAYS` before its delivery date
+    (`reminder_due_at`), so a run only reads the orders that are actually due, and a run
+    with nothing due costs one index lookup. Each vendor gets one digest covering all of
+    its due orders. The digests are queued in the email outbox together with stamping the
+    reminded orders with `reminder_sent_at`, so later runs skip them, and delivered by
+    `drain_email_outbox`.
+
+    Returns:
+    - int: The number of reminded purchase orders.
     """
-    # Get the current date and calculate the upcoming deadline (e.g., 3 days ahead)
-    #print("in sch")
     current_date = now()
-    deadline_threshold = current_date + timedelta(days=3)
+    next_due = next_reminder_due()
+    if next_due is None or next_due > current_date:
+        return 0
 
-    # Find Purchase Orders with upcoming deadlines
-    upcoming_deadlines = PurchaseOrder.objects.filter(
-        delivery_date__lte=deadline_threshold,  # Deadline is within 3 days
-        delivery_date__gte=current_date,       # Deadline is not in the past
-        status='pending'                       # Ensure only pending orders are notified
+    due = PurchaseOrder.objects.filter(reminder_due_at__lte=current_date)
+    # deadlines that already passed, or vendors without an email, are not reminded
+    due.filter(Q(delivery_date__lt=current_date) | Q(vendor__email='')).update(
+        reminder_due_at=None, updated_at=current_date)
+    upcoming_deadlines = due.select_related('vendor').order_by('vendor_id', 'delivery_date')
+
+    reminded = 0
+    digests = []  # (outbox email, reminded purchase order ids)
+    for vendor, purchase_orders in groupby(upcoming_deadlines.iterator(), key=attrgetter('vendor')):
+        purchase_orders = list(purchase_orders)
+        digests.append((_deadline_reminder(vendor, purchase_orders), [po.pk for po in purchase_orders]))
+        reminded += len(purchase_orders)
+        if len(digests) == batch_size:
+            _queue_reminders(digests, current_date)
+            digests = []
+    if digests:
+        _queue_reminders(digests, current_date)
+    return reminded
+
+
+def _deadline_reminder(vendor, purchase_orders):
+    order_lines = "".join(
+        f"- Purchase Order {po.po_number}: due on {po.delivery_date.strftime('%Y-%m-%d %H:%M:%S')}\n"
+        for po in purchase_orders
+    )
+    return EmailOutbox(
+        subject=f"Reminder: Delivery Deadline Approaching for {len(purchase_orders)} Purchase Order(s)",
+        body=f"Dear {vendor.name},\n\n"
+             f"This is a reminder that the delivery deadlines of the following Purchase Orders are approaching:\n\n"
+             f"{order_lines}\n"
+             f"Please ensure timely delivery to avoid any delays.\n\n"
+             f"Best regards,\nYour Vendor Management Team",
+        recipient=vendor.email,
     )
-    print(upcoming_deadlines)
-    for po in upcoming_deadlines:
-        # Send an email to the vendor
-        vendor_email = po.vendor.email  # Assuming email is in contact_details
-        if vendor_email:
-            send_mail(
-                subject=f"Reminder: Delivery Deadline Approaching for PO {po.po_number}",
-                message=f"Dear {po.vendor.name},\n\n"
-                        f"This is a reminder that the delivery deadline for Purchase Order {po.po_number} "
-                        f"is approaching on {po.delivery_date.strftime('%Y-%m-%d %H:%M:%S')}.\n\n"
-                        f"Please ensure timely delivery to avoid any delays.\n\n"
-                        f"Best regards,\nYour Vendor Management Team",
-                from_email=settings.EMAIL_HOST_USER,
-                recipient_list=[vendor_email],
-            )
+
+
+def _queue_reminders(digests, sent_at):
+    with transaction.atomic():
+        queue_emails([email for email, _ in digests])
+        PurchaseOrder.objects.filter(
+            pk__in=[po_id for _, po_ids in digests for po_id in po_ids]).update(
+            reminder_sent_at=sent_at, reminder_due_at=None, updated_at=sent_at)
+
+
+def queue_emails(emails):
+    """
+    Store unsaved EmailOutbox instances in the outbox as part of the current transaction.
+
+    The emails are delivered by `drain_email_outbox`, triggered once the transaction commits
+    (and run periodically by Celery Beat to pick up retries, or emails whose trigger could
+    not be published).
+    """
+    EmailOutbox.objects.bulk_create(emails)
+    # the emails are committed either way: a broker outage is logged, not raised
+    transaction.on_commit(drain_email_outbox.delay, robust=True)
+
+
+@shared_task
+def drain_email_outbox(batch_size=None):
+    """
+    Send the pending emails of the outbox that are due, in batches over one SMTP connection.
+
+    Every email is recorded as sent, or keeps its `pending` status with the error and a
+    next attempt delayed exponentially until `VMS_OUTBOX_MAX_ATTEMPTS` is reached, after
+    which it is marked `failed`. Each batch is claimed in a short transaction and sent
+    outside of it, see `_claim`.
+
+    Returns:
+        dict: The number of emails sent and failed attempts.
+    """
+    batch_size = batch_size or settings.VMS_OUTBOX_BATCH_SIZE
+    sent = failed = 0
+    while True:
+        batch = _claim(batch_size)
+        if not batch:
+            break
+        batch_sent = _deliver(batch)
+        EmailOutbox.objects.bulk_update(batch, ['status', 'next_attempt_at', 'last_error', 'sent_at'])
+        sent += batch_sent
+        failed += len(batch) - batch_sent
+    return {'sent': sent, 'failed': failed}
+
+
+def _claim(batch_size):
+    """
+    Lease a batch of due pending emails to this drain and count their attempt.
+
+    The claimed rows are locked (skipping rows locked by a concurrent drain) only until their
+    `next_attempt_at` is pushed `VMS_OUTBOX_LEASE_SECONDS` ahead, so no transaction or row
+    lock is held while talking to the SMTP server. Emails of a drain that dies before
+    recording the outcome are sent again once their lease expires.
+    """
+    with transaction.atomic():
+        batch = list(EmailOutbox.objects.select_for_update(skip_locked=True).filter(
+            status='pending', next_attempt_at__lte=now()).order_by('next_attempt_at', 'id')[:batch_size])
+        leased_until = now() + timedelta(seconds=settings.VMS_OUTBOX_LEASE_SECONDS)
+        EmailOutbox.objects.filter(pk__in=[email.pk for email in batch]).update(
+            attempts=F('attempts') + 1, next_attempt_at=leased_until)
+    for email in batch:
+        email.attempts += 1
+        email.next_attempt_at = leased_until
+    return batch
+
+
+def _deliver(batch):
+    """
+    Send a batch of claimed outbox emails over one connection, updating their status in place.
+    """
+    sent = 0
+    connection = get_connection()
+    try:
+        for email in batch:
+            try:
+                # no-op while the connection is open; reconnects after a failure
+                connection.open()
+                connection.send_messages([EmailMessage(
+                    subject=email.subject, body=email.body, from_email=settings.EMAIL_HOST_USER,
+                    to=[email.recipient], connection=connection)])
+            except Exception as exc:
+                email.last_error = f'{type(exc).__name__}: {exc}'
+                if email.attempts >= settings.VMS_OUTBOX_MAX_ATTEMPTS:
+                    email.status = 'failed'
+                else:
+                    backoff = settings.VMS_OUTBOX_RETRY_BACKOFF_SECONDS * 2 ** (email.attempts - 1)
+                    email.next_attempt_at = now() + timedelta(seconds=backoff)
+                # start over with a fresh connection for the rest of the batch
+                connection.close()
+                continue
+            email.status = 'sent'
+            email.sent_at = now()
+            email.last_error = ''
+            sent += 1
+    finally:
+        connection.close()
+    return sent
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import views, async_views
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 urlpatterns = [
@@ -16,16 +16,45 @@ urlpatterns = [
     # Vendor Performance Endpoint
     path('api/vendors/<int:vendor_id>/performance/',
          views.vendor_performance, name='vendor-performance'),
+    path('api/vendors/<int:vendor_id>/performance/history/',
+         views.vendor_performance_history, name='vendor-performance-history'),
+    path('api/vendors/leaderboard/',
+         views.vendor_leaderboard, name='vendor-leaderboard'),
+    path('api/vendors/performance/cache/',
+         views.vendor_performance_cache_stats, name='vendor-performance-cache'),
 
     # Purchase Order URLs
     path('api/purchase_orders/', views.PurchaseOrderListCreate.as_view(),
          name='purchaseorder-list'),
+    path('api/purchase_orders/export/', views.PurchaseOrderExport.as_view(),
+         name='purchaseorder-export'),
+    path('api/purchase_orders/bulk/', views.PurchaseOrderBulkCreate.as_view(),
+         name='purchaseorder-bulk'),
+    path('api/purchase_orders/open_quantities/', views.open_quantities,
+         name='purchaseorder-open-quantities'),
     path('api/purchase_orders/<int:pk>/',
          views.PurchaseOrderRetrieveUpdateDestroy.as_view(), name='purchaseorder-detail'),
 
     # Acknowledge Purchase Order
     path('api/purchase_orders/<int:po_id>/acknowledge/',
          views.acknowledge_purchase_order, name='acknowledge-purchaseorder'),
+    path('api/purchase_orders/acknowledge/',
+         views.acknowledge_purchase_orders, name='acknowledge-purchaseorders'),
+
+    # Search
+    path('api/search/', views.search, name='search'),
+
+    # Async read-only endpoints
+    path('api/async/vendors/', async_views.vendor_list, name='async-vendor-list'),
+    path('api/async/vendors/<int:pk>/', async_views.vendor_detail, name='async-vendor-detail'),
+    path('api/async/vendors/<int:vendor_id>/performance/',
+         async_views.vendor_performance, name='async-vendor-performance'),
+    path('api/async/purchase_orders/', async_views.purchase_order_list, name='async-purchaseorder-list'),
+    path('api/async/purchase_orders/<int:pk>/',
+         async_views.purchase_order_detail, name='async-purchaseorder-detail'),
+
+    # Prometheus metrics
+    path('metrics', views.metrics, name='metrics'),
 
      # corn job scheduler api
     path('api/scheduler',views.schedule_task)
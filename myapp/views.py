@@ -1,15 +1,35 @@
+import csv
+import json
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
 from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from rest_framework.renderers import JSONRenderer
 from rest_framework.permissions import IsAuthenticated
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.db.models.functions import Trunc
 from django.utils import timezone
-from .models import Vendor, PurchaseOrder, HistoricalPerformance
-from .serializers import VendorSerializer, PurchaseOrderSerializer, UserSerializer
+from django.utils.crypto import constant_time_compare
+from django.utils.dateparse import parse_date, parse_datetime
+from .models import Vendor, VendorDailyMetrics, PurchaseOrder, PurchaseOrderItem, HistoricalPerformance, EmailOutbox, PERFORMANCE_METRICS, METRIC_RANKING, record_performance
+from .serializers import VendorSerializer, PurchaseOrderSerializer, PurchaseOrderImportSerializer, UserSerializer
+from .pagination import KeysetPagination, PurchaseOrderKeysetPagination
+from .renderers import CSVRenderer, NDJSONRenderer
+from .conditional import ConditionalGetMixin
+from .fieldsets import SparseFieldsetMixin
+from .fastpath import FastListMixin
+from .cache import get_vendor_metrics, add_vendor_metrics, cache_stats
+from .metrics import render_metrics
+from .search import search as search_index, MIN_QUERY_LENGTH, RESULT_TYPES
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
-from .tasks import send_vendor_notification_email
+from .tasks import queue_emails
 from django_celery_beat.models import PeriodicTask, IntervalSchedule
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 
 class RegisterView(APIView):
     def post(self, request):
@@ -34,11 +54,13 @@ class RegisterView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 # Vendor views
-class VendorListCreate(generics.ListCreateAPIView):
+class VendorListCreate(FastListMixin, ConditionalGetMixin, generics.ListCreateAPIView):
     """
     A view for listing and creating Vendor objects.
 
     This view supports listing all Vendor objects and creating new Vendor objects.
+    The list is paginated with a cursor keyed on `id` (`?cursor=`, `?page_size=`).
+    `?fast=1` serves the list from `.values()` rows with the same output.
 
     Authentication:
     - TokenAuthentication: The user must be authenticated with a valid token.
@@ -50,13 +72,15 @@ class VendorListCreate(generics.ListCreateAPIView):
     - permission_classes (list): List of permission classes.
     - queryset (QuerySet): Queryset of all Vendor objects.
     - serializer_class (Serializer): Serializer class for Vendor objects.
+    - pagination_class (Pagination): Keyset pagination on `id`.
     """
 
     permission_classes = [IsAuthenticated]
     queryset = Vendor.objects.all()
     serializer_class = VendorSerializer
+    pagination_class = KeysetPagination
 
-class VendorRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
+class VendorRetrieveUpdateDestroy(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     A view for retrieving, updating, and deleting individual Vendor objects.
 
@@ -86,47 +110,230 @@ def vendor_performance(request, vendor_id):
     Retrieve performance metrics for a specific vendor.
 
     This function retrieves performance metrics for a vendor identified by the given vendor_id.
+    Metrics are served from the cache, which is updated whenever the vendor's metrics change.
+    With `?window=` the metrics only cover the last 30, 90 or 365 days and are summed from
+    the vendor's daily counters.
 
     Parameters:
-    - request: The HTTP request object.
+    - request: The HTTP request object. Supports the query parameter `window`, one of
+      `VMS_METRIC_WINDOWS` (in days).
     - vendor_id (int): The unique identifier of the vendor.
 
     Returns:
     - Response: A JSON response containing the performance metrics of the vendor.
 
     Raises:
+    - HTTP 400: If the window is not supported.
     - HTTP 404: If the vendor with the specified ID does not exist.
     """
+    window = request.query_params.get('window')
+    if window is not None:
+        if window not in [str(days) for days in settings.VMS_METRIC_WINDOWS]:
+            return Response({'error': 'window must be one of ' + ', '.join(map(str, settings.VMS_METRIC_WINDOWS))},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not Vendor.objects.filter(pk=vendor_id).exists():
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        performance_metrics = VendorDailyMetrics.window_metrics(vendor_id, int(window))
+        performance_metrics['window'] = int(window)
+        return Response(performance_metrics)
+
+    performance_metrics = get_vendor_metrics(vendor_id)
+    if performance_metrics is None:
+        performance_metrics = Vendor.objects.filter(pk=vendor_id).values(*PERFORMANCE_METRICS).first()
+        if performance_metrics is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        add_vendor_metrics(vendor_id, performance_metrics)
+    # history is recorded when the metrics change, reads never write
+
+    return Response(performance_metrics)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def vendor_performance_history(request, vendor_id):
+    """
+    Retrieve a vendor's performance history downsampled to hourly, daily or weekly points.
+
+    The history is bucketed and aggregated in the database; for every bucket the response
+    holds the sample-weighted average and the minimum and maximum of each metric, in
+    columnar form (one list per series, aligned with `time`).
+
+    Parameters:
+    - request: The HTTP request object. Supports the query parameters
+      `from` and `to` (ISO 8601 date or datetime, defaulting to the last 365 days)
+      and `bucket` (`hour`, `day` or `week`, defaulting to `day`).
+    - vendor_id (int): The unique identifier of the vendor.
+
+    Returns:
+    - Response: A JSON response containing the columnar history of the vendor.
+
+    Raises:
+    - HTTP 400: If a query parameter is invalid.
+    - HTTP 404: If the vendor with the specified ID does not exist.
+    """
+    bucket = request.query_params.get('bucket', 'day')
+    if bucket not in ('hour', 'day', 'week'):
+        return Response({'error': 'bucket must be one of hour, day or week'}, status=status.HTTP_400_BAD_REQUEST)
     try:
-        vendor = Vendor.objects.get(pk=vendor_id)
-    except Vendor.DoesNotExist:
+        end = parse_timestamp(request.query_params.get('to')) or timezone.now()
+        start = parse_timestamp(request.query_params.get('from')) or end - timedelta(days=365)
+    except ValueError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    if not Vendor.objects.filter(pk=vendor_id).exists():
         return Response(status=status.HTTP_404_NOT_FOUND)
 
-    performance_metrics = {
-        'on_time_delivery_rate': vendor.on_time_delivery_rate,
-        'quality_rating_avg': vendor.quality_rating_avg,
-        'average_response_time': vendor.average_response_time,
-        'fulfillment_rate': vendor.fulfillment_rate
+    aggregates = {'total_samples': Sum('samples')}
+    for metric in PERFORMANCE_METRICS:
+        aggregates[f'{metric}_avg'] = Sum(F(metric) * F('samples')) / Sum('samples')
+        aggregates[f'{metric}_min'] = Min(metric)
+        aggregates[f'{metric}_max'] = Max(metric)
+    rows = HistoricalPerformance.objects.filter(
+        vendor_id=vendor_id, date__gte=start, date__lt=end,
+    ).annotate(time=Trunc('date', bucket)).values('time').annotate(**aggregates).order_by('time')
+
+    history = {
+        'vendor_id': vendor_id,
+        'bucket': bucket,
+        'from': start,
+        'to': end,
+        'time': [],
+        'samples': [],
     }
-    # optional to insert data
-    HistoricalPerformance.objects.create(
-        vendor=vendor,
-        date=timezone.now(),
-        on_time_delivery_rate=vendor.on_time_delivery_rate,
-        quality_rating_avg=vendor.quality_rating_avg,
-        average_response_time=vendor.average_response_time,
-        fulfillment_rate=vendor.fulfillment_rate
-    )
+    for metric in PERFORMANCE_METRICS:
+        history[metric] = {'avg': [], 'min': [], 'max': []}
+    for row in rows:
+        history['time'].append(row['time'])
+        history['samples'].append(row['total_samples'])
+        for metric in PERFORMANCE_METRICS:
+            for statistic in ('avg', 'min', 'max'):
+                history[metric][statistic].append(row[f'{metric}_{statistic}'])
 
-    return Response(performance_metrics)
+    return Response(history)
+
+
+def parse_timestamp(value):
+    """
+    Parse an ISO 8601 date or datetime query parameter into an aware datetime.
+    """
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        parsed_date = parse_date(value)
+        if parsed_date is None:
+            raise ValueError(f'Invalid date "{value}"')
+        parsed = datetime.combine(parsed_date, datetime.min.time())
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def vendor_leaderboard(request):
+    """
+    Rank vendors by one performance metric.
+
+    Only vendors the metric is defined for take part (e.g. vendors with at least one
+    completed order for `on_time_delivery_rate`). The ranking reads the partial
+    (metric, id) index of the metric, so the top of the list and a single vendor's
+    position are found without scanning or sorting the vendor table. Ties share a rank.
+    `percentile` is the percentage of the other ranked vendors that perform strictly worse.
+
+    Parameters:
+    - request: The HTTP request object. Supports the query parameters
+      `metric` (one of the performance metrics, defaulting to `on_time_delivery_rate`),
+      `order` (`best` or `worst`, defaulting to `best`), `limit` (1 to 100, defaulting to 20)
+      and `vendor_id` (return the rank of that vendor instead of a list).
+
+    Returns:
+    - Response: A JSON response containing the ranked vendors, or the rank of one vendor.
+
+    Raises:
+    - HTTP 400: If a query parameter is invalid.
+    - HTTP 404: If `vendor_id` is given and the vendor is not ranked by the metric.
+    """
+    metric = request.query_params.get('metric', 'on_time_delivery_rate')
+    if metric not in METRIC_RANKING:
+        return Response({'error': f'metric must be one of {", ".join(METRIC_RANKING)}'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    order = request.query_params.get('order', 'best')
+    if order not in ('best', 'worst'):
+        return Response({'error': 'order must be best or worst'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = int(request.query_params.get('limit', 20))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= 100:
+        return Response({'error': 'limit must be an integer between 1 and 100'}, status=status.HTTP_400_BAD_REQUEST)
+
+    counter, higher_is_better = METRIC_RANKING[metric]
+    ranked = Vendor.objects.filter(**{f'{counter}__gt': 0})
+    total = ranked.count()
+
+    def rank_entry(row, better, ties):
+        worse = total - better - ties
+        return {
+            'id': row['id'],
+            'vendor_code': row['vendor_code'],
+            'name': row['name'],
+            metric: row[metric],
+            'rank': better + 1,
+            'percentile': round(100.0 * worse / (total - 1), 2) if total > 1 else 100.0,
+        }
+
+    fields = ('id', 'vendor_code', 'name', metric)
+    vendor_id = request.query_params.get('vendor_id')
+    if vendor_id is not None:
+        row = ranked.filter(pk=vendor_id).values(*fields).first() if vendor_id.isdigit() else None
+        if row is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        better_lookup = 'gt' if higher_is_better else 'lt'
+        better = ranked.filter(**{f'{metric}__{better_lookup}': row[metric]}).count()
+        ties = ranked.filter(**{metric: row[metric]}).count()
+        return Response({'metric': metric, 'total_vendors': total, 'vendor': rank_entry(row, better, ties)})
+
+    # vendors are listed best (or worst) first, so everything that ranks ahead of a
+    # value is already in the list; only ties of the last value can extend past it
+    descending = higher_is_better == (order == 'best')
+    rows = list(ranked.order_by(f'-{metric}' if descending else metric, 'id').values(*fields)[:limit])
+    ahead, ties = {}, defaultdict(int)
+    for position, row in enumerate(rows):
+        ahead.setdefault(row[metric], position)
+        ties[row[metric]] += 1
+    if len(rows) == limit:
+        ties[rows[-1][metric]] = ranked.filter(**{metric: rows[-1][metric]}).count()
+
+    results = []
+    for row in rows:
+        before, same = ahead[row[metric]], ties[row[metric]]
+        better = before if order == 'best' else total - before - same
+        results.append(rank_entry(row, better, same))
+    return Response({'metric': metric, 'order': order, 'total_vendors': total, 'results': results})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def vendor_performance_cache_stats(request):
+    """
+    Retrieve the hit and miss counters of the vendor performance cache.
+    """
+    return Response(cache_stats())
 
 # Purchase order views
-class PurchaseOrderListCreate(generics.ListCreateAPIView):
+class PurchaseOrderListCreate(FastListMixin, SparseFieldsetMixin, ConditionalGetMixin, generics.ListCreateAPIView):
     """
     A view for listing and creating Purchase Order objects.
+
+    The list is paginated with a cursor keyed on `id`, or on `order_date` with
+    `?ordering=order_date` / `?ordering=-order_date` (`?cursor=`, `?page_size=`).
+    `?fields=` / `?exclude=` select the returned fields and the columns that are read.
+    `?fast=1` serves the list from `.values()` rows with the same output.
     """
     permission_classes = [IsAuthenticated]
     serializer_class = PurchaseOrderSerializer
+    pagination_class = PurchaseOrderKeysetPagination
 
     def get_queryset(self):
         vendor_id = self.request.query_params.get('vendor_id')
@@ -134,9 +341,16 @@ class PurchaseOrderListCreate(generics.ListCreateAPIView):
             return PurchaseOrder.objects.filter(vendor__id=vendor_id)
         return PurchaseOrder.objects.all()
 
+    def list(self, request, *args, **kwargs):
+        vendor_id = request.query_params.get('vendor_id')
+        if vendor_id and not vendor_id.isdigit():
+            return Response({'error': 'vendor_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        return super().list(request, *args, **kwargs)
+
+    @transaction.atomic
     def perform_create(self, serializer):
         """
-        Save the Purchase Order and send a notification email to the vendor.
+        Save the Purchase Order and queue a notification email to the vendor in the same transaction.
         """
         # Save the purchase order instance
         purchase_order = serializer.save()
@@ -158,16 +372,261 @@ class PurchaseOrderListCreate(generics.ListCreateAPIView):
             f"Best regards,\n[Vendor Management System]"
         )
 
-        # Trigger the Celery task to send the email
+        # Queue the email in the outbox, it is sent once the order is committed
         if vendor_email:
-            send_vendor_notification_email.delay(vendor_email, subject, message)
+            queue_emails([EmailOutbox(recipient=vendor_email, subject=subject, body=message)])
+
+
+class PurchaseOrderExport(APIView):
+    """
+    A view for exporting Purchase Orders as CSV or NDJSON.
+
+    The export is streamed: rows are read from a server-side cursor in chunks of
+    `chunk_size` and encoded as they are sent, so memory use does not grow with the
+    number of exported orders. The columns match the fields accepted by the bulk import.
+
+    Query parameters:
+    - format: `csv` (default) or `ndjson`.
+    - vendor_id: Only export the orders of this vendor.
+    - from / to: Only export orders with `from <= order_date < to` (ISO 8601 date or datetime).
+
+    Permissions:
+    - IsAuthenticated: Only authenticated users are allowed access.
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [CSVRenderer, NDJSONRenderer]
+    chunk_size = 2000
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if isinstance(response, Response) and response.status_code >= 400:
+            # errors, including a failed content negotiation, are not exports
+            response.accepted_renderer = JSONRenderer()
+            response.accepted_media_type = JSONRenderer.media_type
+        return response
+
+    def get(self, request):
+        try:
+            start = parse_timestamp(request.query_params.get('from'))
+            end = parse_timestamp(request.query_params.get('to'))
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        vendor_id = request.query_params.get('vendor_id')
+        if vendor_id and not vendor_id.isdigit():
+            return Response({'error': 'vendor_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = PurchaseOrder.objects.order_by('id')
+        if vendor_id:
+            queryset = queryset.filter(vendor_id=vendor_id)
+        if start:
+            queryset = queryset.filter(order_date__gte=start)
+        if end:
+            queryset = queryset.filter(order_date__lt=end)
+
+        # the id and the fields the bulk import accepts, in model order
+        serializer_fields = PurchaseOrderSerializer().fields
+        fields = [
+            field.attname for field in PurchaseOrder._meta.concrete_fields
+            if field.primary_key or (field.name in serializer_fields and not serializer_fields[field.name].read_only)
+        ]
+        header = ['vendor' if field == 'vendor_id' else field for field in fields]
+        rows = (
+            [export_value(value) for value in row]
+            for row in queryset.values_list(*fields).iterator(chunk_size=self.chunk_size)
+        )
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(header, rows), content_type=f'{renderer.media_type}; charset={renderer.charset}')
+        response['Content-Disposition'] = f'attachment; filename="purchase_orders.{renderer.format}"'
+        return response
+
+
+def export_value(value):
+    """
+    Convert a database value to the representation used by the PurchaseOrderSerializer.
+    """
+    if isinstance(value, datetime):
+        value = timezone.localtime(value).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+    elif isinstance(value, date):
+        value = value.isoformat()
+    return value
+
+
+class PurchaseOrderBulkCreate(APIView):
+    """
+    A view for importing Purchase Orders in bulk.
+
+    Accepts a request body streamed as NDJSON (`application/x-ndjson`, one PO object per
+    line) or CSV (`text/csv`, header row with the PO field names, `items` JSON-encoded).
+    Rows are validated with the PurchaseOrderSerializer rules and inserted in chunks with
+    `bulk_create`, each chunk in its own transaction. Invalid rows are reported and skipped.
+    Vendor metrics are recomputed and a single notification email is queued in the email outbox
+    per affected vendor at the end, also for the chunks imported before a failure.
+
+    Permissions:
+    - IsAuthenticated: Only authenticated users are allowed access.
+    """
+    permission_classes = [IsAuthenticated]
+    chunk_size = 1000
+
+    NDJSON_CONTENT_TYPES = ('application/x-ndjson', 'application/ndjson')
+    CSV_CONTENT_TYPES = ('text/csv',)
+
+    def post(self, request):
+        content_type = request.content_type.split(';')[0].strip()
+        if content_type in self.NDJSON_CONTENT_TYPES:
+            rows = self.read_ndjson(request.stream)
+        elif content_type in self.CSV_CONTENT_TYPES:
+            rows = self.read_csv(request.stream)
+        else:
+            return Response({'error': f'Unsupported content type "{content_type}"'},
+                            status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+        errors = []
+        created = defaultdict(list)  # vendor id -> imported purchase orders
+        seen_po_numbers = set()
+        chunk = []
+        try:
+            for row_number, row in rows:
+                chunk.append((row_number, row))
+                if len(chunk) == self.chunk_size:
+                    self.import_chunk(chunk, seen_po_numbers, created, errors)
+                    chunk = []
+            if chunk:
+                self.import_chunk(chunk, seen_po_numbers, created, errors)
+        finally:
+            # each chunk is committed on its own: settle the chunks imported so far even
+            # if a later one failed
+            self.finish_import(created)
+
+        total_created = sum(len(purchase_orders) for purchase_orders in created.values())
+        if total_created:
+            response_status = status.HTTP_201_CREATED
+        elif errors:
+            response_status = status.HTTP_400_BAD_REQUEST
+        else:
+            response_status = status.HTTP_200_OK
+        return Response({'created': total_created, 'errors': errors}, status=response_status)
+
+    def finish_import(self, created):
+        """
+        Recompute the metrics of the vendors with imported orders and queue their notifications.
+        """
+        # one metric recompute for all affected vendors
+        if settings.VMS_METRICS_ASYNC:
+            for vendor_id in created:
+                Vendor.mark_metrics_dirty(vendor_id)
+        else:
+            for vendor in Vendor.rebuild_all_metric_counters(vendor_ids=list(created)):
+                record_performance(vendor)
+
+        # one notification per vendor, queued in the outbox in one go
+        notifications = [
+            self.vendor_notification(purchase_orders[0].vendor, purchase_orders)
+            for purchase_orders in created.values() if purchase_orders[0].vendor.email
+        ]
+        if notifications:
+            queue_emails(notifications)
+
+    @staticmethod
+    def read_ndjson(stream):
+        for row_number, line in enumerate(stream or (), start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield row_number, json.loads(line)
+            except ValueError as exc:
+                yield row_number, exc
+
+    @staticmethod
+    def read_csv(stream):
+        lines = (line.decode('utf-8') for line in stream or ())
+        for row_number, row in enumerate(csv.DictReader(lines), start=1):
+            # empty cells are treated as missing values
+            row = {field: value for field, value in row.items() if value not in ('', None)}
+            if 'items' in row:
+                try:
+                    row['items'] = json.loads(row['items'])
+                except ValueError as exc:
+                    row = exc
+            yield row_number, row
+
+    def import_chunk(self, chunk, seen_po_numbers, created, errors):
+        """
+        Validate and insert one chunk of rows with a constant number of queries.
+        """
+        rows = [row for _, row in chunk if isinstance(row, dict)]
+        vendor_ids = set()
+        for row in rows:
+            try:
+                vendor_ids.add(int(row.get('vendor')))
+            except (TypeError, ValueError):
+                pass
+        vendors = Vendor.objects.in_bulk(vendor_ids)
+        existing_po_numbers = set(PurchaseOrder.objects.filter(
+            po_number__in=[row.get('po_number') for row in rows]).values_list('po_number', flat=True))
+
+        purchase_orders = []
+        for row_number, row in chunk:
+            if not isinstance(row, dict):
+                errors.append({'row': row_number, 'errors': {'non_field_errors': [f'Invalid row: {row}']}})
+                continue
+            serializer = PurchaseOrderImportSerializer(data=row, context={'vendors': vendors})
+            if not serializer.is_valid():
+                errors.append({'row': row_number, 'errors': serializer.errors})
+                continue
+            po_number = serializer.validated_data['po_number']
+            if po_number in existing_po_numbers or po_number in seen_po_numbers:
+                errors.append({'row': row_number, 'errors': {
+                    'po_number': ['purchase order with this po number already exists.']}})
+                continue
+            seen_po_numbers.add(po_number)
+
+            purchase_order = PurchaseOrder(**serializer.validated_data)
+            # bulk_create sends no pre_save
+            purchase_order.set_derived_fields()
+            purchase_orders.append(purchase_order)
+
+        with transaction.atomic():
+            PurchaseOrder.objects.bulk_create(purchase_orders)
+            if purchase_orders and purchase_orders[0].pk is None:
+                # bulk_create only returns primary keys on some backends
+                purchase_orders = list(PurchaseOrder.objects.filter(
+                    po_number__in=[purchase_order.po_number for purchase_order in purchase_orders]))
+            # bulk_create sends no post_save, add the line items here
+            PurchaseOrderItem.objects.bulk_create(PurchaseOrderItem.for_orders(purchase_orders))
+        for purchase_order in purchase_orders:
+            created[purchase_order.vendor_id].append(purchase_order)
+
+    def vendor_notification(self, vendor, purchase_orders):
+        """
+        Build the single notification email listing all of a vendor's imported orders.
+        """
+        subject = f"{len(purchase_orders)} New Purchase Orders Issued"
+        order_lines = "".join(
+            f"- PO#{purchase_order.po_number}: Items: {purchase_order.items}, "
+            f"Delivery Date: {purchase_order.delivery_date}\n"
+            for purchase_order in purchase_orders
+        )
+        message = (
+            f"Dear {vendor.name},\n\n"
+            f"The following Purchase Orders have been issued to you:\n\n"
+            f"{order_lines}\n"
+            f"Please acknowledge these orders at your earliest convenience.\n\n"
+            f"Best regards,\n[Vendor Management System]"
+        )
+        return EmailOutbox(recipient=vendor.email, subject=subject, body=message)
 
 
-class PurchaseOrderRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
+class PurchaseOrderRetrieveUpdateDestroy(SparseFieldsetMixin, ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     A view for retrieving, updating, and deleting individual PurchaseOrder objects.
 
     This view supports retrieving, updating, and deleting individual PurchaseOrder objects by their unique identifier.
+    Retrieval supports `?fields=` / `?exclude=` to select the returned fields and the columns that are read.
 
     Authentication:
     - TokenAuthentication: The user must be authenticated with a valid token.
@@ -213,18 +672,219 @@ def acknowledge_purchase_order(request, po_id):
 
     return Response({'message': 'Purchase Order acknowledged successfully'}, status=status.HTTP_200_OK)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def acknowledge_purchase_orders(request):
+    """
+    Acknowledge many purchase orders at once.
+
+    The unacknowledged orders among the given ids are locked, acknowledged with a single
+    UPDATE and their response times are added to the counters of each affected vendor
+    once, instead of saving every order separately. Orders that are already acknowledged
+    keep their acknowledgment date.
+
+    Parameters:
+    - request: The HTTP request object. The body holds `ids`, a list of up to 1000
+      purchase order ids.
+
+    Returns:
+    - Response: A JSON response listing the `acknowledged`, `already_acknowledged` and
+      `not_found` ids.
+
+    Raises:
+    - HTTP 400: If the body is not an object or `ids` is missing or not a list of integers.
+    """
+    ids = request.data.get('ids') if isinstance(request.data, dict) else None
+    if (not isinstance(ids, list) or not ids or len(ids) > 1000
+            or not all(isinstance(po_id, int) and not isinstance(po_id, bool) for po_id in ids)):
+        return Response({'error': 'ids must be a list of 1 to 1000 purchase order ids'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    with transaction.atomic():
+        orders = list(PurchaseOrder.objects.select_for_update().filter(pk__in=ids).order_by('pk').values_list(
+            'pk', 'vendor_id', 'issue_date', 'acknowledgment_date'))
+        pending = [(po_id, vendor_id, issue_date) for po_id, vendor_id, issue_date, acknowledged in orders
+                   if acknowledged is None]
+        acknowledged_at = timezone.now()
+        PurchaseOrder.objects.filter(pk__in=[po_id for po_id, _, _ in pending]).update(
+            acknowledgment_date=acknowledged_at, updated_at=acknowledged_at)
+
+        deltas = defaultdict(lambda: {'response_time_sum': 0, 'response_time_count': 0})
+        for _, vendor_id, issue_date in pending:
+            deltas[vendor_id]['response_time_sum'] += (acknowledged_at - issue_date).total_seconds()
+            deltas[vendor_id]['response_time_count'] += 1
+        # lock vendors in a consistent order
+        for vendor_id in sorted(deltas):
+            if settings.VMS_METRICS_ASYNC:
+                Vendor.mark_metrics_dirty(vendor_id)
+                continue
+            vendor = Vendor.apply_metric_delta(vendor_id, deltas[vendor_id])
+            record_performance(vendor)
+        if not settings.VMS_METRICS_ASYNC:
+            # response times count on the day of the acknowledgment
+            today = timezone.localdate(acknowledged_at)
+            VendorDailyMetrics.apply_deltas({(vendor_id, today): delta for vendor_id, delta in deltas.items()})
+
+    found = {po_id for po_id, _, _, _ in orders}
+    acknowledged = {po_id for po_id, _, _ in pending}
+    return Response({
+        'acknowledged': sorted(acknowledged),
+        'already_acknowledged': sorted(found - acknowledged),
+        'not_found': sorted(set(ids) - found),
+    }, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def open_quantities(request):
+    """
+    Report the quantities of each SKU on open (pending) purchase orders, per vendor.
+
+    The quantities are summed in the database over the PurchaseOrderItem rows, through the
+    SKU and vendor indexes, without loading any purchase order.
+
+    Parameters:
+    - request: The HTTP request object. Supports the query parameters `sku` and `vendor_id`
+      (filters), `per_vendor` (`false` to total each SKU over all vendors), `limit`
+      (1 to 1000, defaulting to 100) and `offset`.
+
+    Returns:
+    - Response: A JSON response with the `results`, ordered by SKU then vendor (`sku`,
+      `vendor` unless totalled over vendors, `open_quantity` and the number of
+      `purchase_orders`), and the `next` page URL.
+
+    Raises:
+    - HTTP 400: If a query parameter is invalid.
+    """
+    try:
+        limit = int(request.query_params.get('limit', 100))
+        offset = int(request.query_params.get('offset', 0))
+        vendor_id = request.query_params.get('vendor_id')
+        vendor_id = int(vendor_id) if vendor_id is not None else None
+    except ValueError:
+        limit = offset = -1
+    if not 1 <= limit <= 1000 or offset < 0:
+        return Response({'error': 'limit must be an integer between 1 and 1000, offset a non-negative integer '
+                                  'and vendor_id an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    per_vendor = request.query_params.get('per_vendor', 'true') not in ('0', 'false', 'False')
+
+    line_items = PurchaseOrderItem.objects.filter(purchase_order__status='pending')
+    if 'sku' in request.query_params:
+        line_items = line_items.filter(sku=request.query_params['sku'])
+    if vendor_id is not None:
+        line_items = line_items.filter(vendor_id=vendor_id)
+    group_by = ('sku', 'vendor') if per_vendor else ('sku',)
+    rows = list(line_items.values(*group_by).annotate(
+        open_quantity=Sum('quantity'),
+        purchase_orders=Count('purchase_order_id', distinct=True),
+    ).order_by(*group_by)[offset:offset + limit + 1])
+
+    next_url = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        params = request.query_params.copy()
+        params['offset'] = offset + limit
+        next_url = request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+    return Response({'next': next_url, 'results': rows})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search(request):
+    """
+    Search vendors by name or vendor code and purchase orders by PO number or item name.
+
+    Matches are substrings of at least three characters, found through a trigram index
+    (see `myapp.search`) and returned best match first.
+
+    Parameters:
+    - request: The HTTP request object. Supports the query parameters `q` (the text to
+      search), `type` (`vendor` or `purchase_order`, defaulting to both), `limit`
+      (1 to 100, defaulting to 20) and `offset`.
+
+    Returns:
+    - Response: A JSON response with the `results` (`type`, `id`, `label` and `score` of each
+      match) and the `next` page URL.
+
+    Raises:
+    - HTTP 400: If a query parameter is invalid.
+    """
+    query = request.query_params.get('q', '').strip()
+    if len(query) < MIN_QUERY_LENGTH:
+        return Response({'error': f'q must be at least {MIN_QUERY_LENGTH} characters'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    result_type = request.query_params.get('type')
+    if result_type is not None and result_type not in RESULT_TYPES:
+        return Response({'error': f'type must be one of {", ".join(RESULT_TYPES)}'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = int(request.query_params.get('limit', 20))
+        offset = int(request.query_params.get('offset', 0))
+    except ValueError:
+        limit = offset = -1
+    if not 1 <= limit <= 100 or offset < 0:
+        return Response({'error': 'limit must be an integer between 1 and 100 and offset a non-negative integer'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    results = search_index(query, (result_type,) if result_type else RESULT_TYPES, limit + 1, offset)
+    next_url = None
+    if len(results) > limit:
+        results = results[:limit]
+        params = request.query_params.copy()
+        params['offset'] = offset + limit
+        next_url = request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+    return Response({
+        'next': next_url,
+        'results': [
+            {'type': match_type, 'id': pk, 'label': label, 'score': round(score, 6)}
+            for match_type, pk, label, score in results
+        ],
+    })
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def schedule_task(request):
+    """
+    Schedule the delivery deadline reminders.
+
+    Registers (or updates) the periodic task polling for due reminders, so calling the
+    endpoint again does not create a second schedule. Each poll only checks the earliest
+    `reminder_due_at` and does no further work until a reminder is due.
+
+    Returns:
+    - HttpResponse: A confirmation message.
+    """
     interval, _ = IntervalSchedule.objects.get_or_create(
         every=30,
         period=IntervalSchedule.SECONDS,
     )
 
-    PeriodicTask.objects.create(
-        interval=interval,
+    PeriodicTask.objects.update_or_create(
         name="deadline-scheduler_01",
-        task="myapp.tasks.send_delivery_deadline_reminders",
+        defaults={
+            'interval': interval,
+            'task': "myapp.tasks.send_delivery_deadline_reminders",
+            'enabled': True,
+        },
     )
 
-    return HttpResponse("Task scheduled!")
\ No newline at end of file
+    return HttpResponse("Task scheduled!")
+
+
+def metrics(request):
+    """
+    Expose the request, Celery task and cache metrics in the Prometheus text format.
+
+    Parameters:
+    - request: The HTTP request object. When `VMS_PROMETHEUS_TOKEN` is set it must carry
+      an `Authorization: Bearer <token>` header.
+
+    Returns:
+    - HttpResponse: The metrics as `text/plain`.
+
+    Raises:
+    - HTTP 401: If the token is configured and missing or wrong.
+    """
+    token = settings.VMS_PROMETHEUS_TOKEN
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=401)
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 from pathlib import Path
+from celery.schedules import crontab
 from dotenv import load_dotenv
 import os
 
@@ -49,6 +50,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'myapp.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -147,16 +149,91 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'myapp.authentication.CachedJWTAuthentication',
     ),
+    # default page size of the keyset paginated list endpoints
+    'PAGE_SIZE': 100,
 }
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+if os.getenv("REDIS_URI"):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv("REDIS_URI"),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 #Celery settings
 CELERY_BROKER_URL = os.getenv("REDIS_URI")
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_RESULT_BACKEND = os.getenv("REDIS_URI")
 CELERY_TASK_SERIALIZER = 'json'
 
+#vendor metrics settings
+# when enabled, PurchaseOrder changes only mark the vendor dirty and a Celery
+# task recomputes its metrics, coalescing bursts of updates per vendor
+VMS_METRICS_ASYNC = os.getenv("VMS_METRICS_ASYNC", "False") == "True"
+VMS_METRICS_DEBOUNCE_SECONDS = int(os.getenv("VMS_METRICS_DEBOUNCE_SECONDS", 5))
+# how long (in seconds) vendor metrics stay cached
+VMS_METRICS_CACHE_TIMEOUT = 300
+
+# how long (in seconds) authenticated users stay cached; with the per-process locmem cache a
+# change to a user can take this long to reach the other processes, Redis is shared by all
+VMS_AUTH_USER_CACHE_TIMEOUT = 60
+
+#performance history retention (in days) per bucket granularity
+VMS_HISTORY_HOURLY_RETENTION_DAYS = 7
+VMS_HISTORY_DAILY_RETENTION_DAYS = 365
+VMS_HISTORY_MONTHLY_RETENTION_DAYS = 5 * 365
+
+#rolling metric windows (in days) served by /api/vendors/{id}/performance/?window=
+VMS_METRIC_WINDOWS = (30, 90, 365)
+
+#delivery deadline reminders
+# vendors are reminded this many days before the delivery date of a pending order
+VMS_REMINDER_LEAD_DAYS = 3
+
+#email outbox
+# emails sent per SMTP connection by the drain task
+VMS_OUTBOX_BATCH_SIZE = 100
+# failed deliveries are retried after 1, 2, 4, ... minutes, up to this many attempts
+VMS_OUTBOX_MAX_ATTEMPTS = 5
+VMS_OUTBOX_RETRY_BACKOFF_SECONDS = 60
+# emails claimed by a drain are only sent again after this long if it dies before recording them
+VMS_OUTBOX_LEASE_SECONDS = 300
+
+#instrumentation
+# when set, /metrics requires an `Authorization: Bearer <token>` header
+VMS_PROMETHEUS_TOKEN = os.getenv("VMS_PROMETHEUS_TOKEN")
+
+CELERY_BEAT_SCHEDULE = {
+    'drain-email-outbox': {
+        'task': 'myapp.tasks.drain_email_outbox',
+        'schedule': 60.0,
+    },
+    'requeue-dirty-vendor-metrics': {
+        'task': 'myapp.tasks.requeue_dirty_vendor_metrics',
+        'schedule': 600.0,
+    },
+    'refresh-all-vendor-metrics': {
+        'task': 'myapp.tasks.refresh_all_vendor_metrics',
+        'schedule': crontab(hour=1, minute=30),
+    },
+    'compact-performance-history': {
+        'task': 'myapp.tasks.compact_performance_history',
+        'schedule': crontab(hour=2, minute=15),
+    },
+}
+
 #email settings
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'